@@ -0,0 +1,162 @@
+"""
+Cold start benchmark for the employee_events package
+and the report app, based on `python -X importtime`.
+
+Each target is imported in a fresh interpreter several
+times and the median cumulative import time is reported
+along with the slowest modules and any heavy dependency
+that was loaded eagerly.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5]
+        [--output results.json] [--baseline baseline.json]
+        [--tolerance 0.25]
+"""
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+project_root = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    'employee_events': dict(
+        code='import employee_events',
+        cwd=project_root,
+    ),
+    'employee_events.Employee': dict(
+        code='from employee_events import Employee, Team',
+        cwd=project_root,
+    ),
+    'report': dict(
+        code='import dashboard',
+        cwd=project_root / 'report',
+    ),
+}
+
+# Dependencies that should only load on first use
+HEAVY_MODULES = ['pandas', 'matplotlib', 'sklearn', 'scipy']
+
+
+def run_importtime(code, cwd):
+    """
+    Returns a list of (module, self_us, cumulative_us, depth)
+    tuples from the `-X importtime` output of running `code`.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def startup_modules():
+    """
+    Modules the interpreter imports before running any code.
+    """
+    return {row[0] for row in run_importtime('pass', project_root)}
+
+
+def measure(code, cwd, baseline_modules):
+    """
+    Returns the cumulative import time in milliseconds
+    of the modules `code` imports beyond interpreter startup,
+    along with every parsed row.
+    """
+    rows = run_importtime(code, cwd)
+    top_level = [
+        row for row in rows
+        if row[3] == 0 and row[0] not in baseline_modules
+    ]
+    total_ms = sum(row[2] for row in top_level) / 1000
+    return total_ms, rows
+
+
+def benchmark(repeat=5, targets=TARGETS):
+    baseline_modules = startup_modules()
+    results = {}
+    for name, target in targets.items():
+        timings = []
+        for _ in range(repeat):
+            total_ms, rows = measure(target['code'], target['cwd'], baseline_modules)
+            timings.append(total_ms)
+
+        loaded = {row[0] for row in rows}
+        slowest = sorted(
+            (row for row in rows if row[0] not in baseline_modules),
+            key=lambda row: row[1], reverse=True,
+        )[:10]
+        results[name] = dict(
+            median_ms=statistics.median(timings),
+            min_ms=min(timings),
+            max_ms=max(timings),
+            heavy_modules=[m for m in HEAVY_MODULES if m in loaded],
+            slowest=[(row[0], row[1] / 1000) for row in slowest],
+        )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of messages for every target that got
+    slower than its baseline by more than `tolerance`, or
+    that loads a heavy module the baseline did not.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        allowed = baseline[name]['median_ms'] * (1 + tolerance)
+        if result['median_ms'] > allowed:
+            regressions.append(
+                f"{name}: {result['median_ms']:.1f}ms > {allowed:.1f}ms allowed")
+        new_heavy = set(result['heavy_modules']) - set(baseline[name]['heavy_modules'])
+        if new_heavy:
+            regressions.append(f"{name}: now imports {sorted(new_heavy)} eagerly")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=Path,
+                        help="Write the results to this JSON file")
+    parser.add_argument('--baseline', type=Path,
+                        help="Fail if slower than the results in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.repeat)
+
+    for name, result in results.items():
+        print(f"{name:<28} median {result['median_ms']:8.1f} ms "
+              f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f})")
+        if result['heavy_modules']:
+            print(f"{'':<28} eagerly imports {', '.join(result['heavy_modules'])}")
+        for module, self_ms in result['slowest'][:5]:
+            print(f"{'':<28}   {self_ms:7.1f} ms  {module}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()),
+                              args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Latency and memory benchmark for the employee_events queries,
+the dashboard components and full page renders.
+
+A database is generated for every requested size with the
+seeded generator in `src/synthetic_data.py` and cached between
+runs. Each size is then benchmarked in a fresh interpreter that
+points the package's connection pool and event store at it.
+The benchmarks cover:
+
+- every `Employee` and `Team` query method, against SQLite
+  and, where the dashboard uses it, against the event store
+- the `LineChart` and `BarChart` images and the `NotesTable`
+  and `ReportDropdown` components, with the caches cleared
+- `/employee/{id}` and `/team/{id}` through an in-process
+  test client, middleware included
+
+Every benchmark cycles through a sample of entity ids and
+reports latency percentiles and its peak traced allocation.
+
+Usage:
+    python benchmarks/latency.py [--sizes small medium]
+        [--samples 200] [--seed 0] [--data-dir DIR]
+        [--output results.json] [--baseline baseline.json]
+        [--tolerance 0.25]
+"""
+from importlib.util import spec_from_file_location, module_from_spec
+from pathlib import Path
+import argparse
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+project_root = Path(__file__).resolve().parent.parent
+
+# Generated databases, from the packaged size to a few
+# years of events for thousands of employees
+SIZES = {
+    'small': dict(employees=25, teams=5, start='2024-01-01'),
+    'medium': dict(employees=500, teams=20, start='2023-01-01'),
+    'large': dict(employees=5000, teams=100, start='2022-01-01'),
+}
+END_DATE = '2024-12-31'
+
+# Number of entity ids each benchmark cycles through
+ENTITY_SAMPLE = 50
+
+# Slowdowns smaller than this are treated as noise
+NOISE_MS = 0.1
+
+# Fewer timings than this leave p99 as an interpolation
+# of the slowest few calls, so it is not reported
+P99_SAMPLES = 100
+
+
+def load_module(name, path):
+    # src/utils.py and report/utils.py share a module
+    # name, so neither directory is put on the path
+    spec = spec_from_file_location(name, path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_database(size, seed, directory):
+    """
+    Returns the path of the generated database for `size`,
+    building and scoring it unless it is already cached.
+    """
+    from employee_events.bulk_load import StagingDatabase
+    from employee_events.migrations import latest_version
+    from employee_events.risk_scores import refresh
+
+    path = Path(directory) / f"{size}-seed{seed}-v{latest_version()}.db"
+    if path.exists():
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    synthetic_data = load_module('synthetic_data', project_root / 'src' / 'synthetic_data.py')
+    data = synthetic_data.SyntheticData(seed=seed, end=END_DATE, **SIZES[size])
+    with StagingDatabase(path) as staging:
+        staging.load('team', [data.teams()])
+        staging.load('employee', [data.employees()])
+        staging.load('notes', [data.notes()])
+        staging.load('employee_events', data.events())
+        staging.upgrade()
+
+        # Score with the dashboard's model, as `refresh_risk_scores` does
+        report_utils = load_module('report_utils', project_root / 'report' / 'utils.py')
+        scorer = report_utils.scorer_path
+        model = scorer if scorer.exists() else report_utils.model_path
+        refresh(model, staging.path, loader=report_utils.load_model)
+    return path
+
+
+def sample_count(value):
+    # statistics.quantiles needs at least two timings
+    count = int(value)
+    if count < 2:
+        raise argparse.ArgumentTypeError(f"needs at least 2 samples, got {count}")
+    return count
+
+
+def summarize(timings, peak_bytes):
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return dict(
+        p50_ms=percentiles[49],
+        p90_ms=percentiles[89],
+        p99_ms=percentiles[98] if len(timings) >= P99_SAMPLES else None,
+        mean_ms=statistics.fmean(timings),
+        min_ms=min(timings),
+        max_ms=max(timings),
+        samples=len(timings),
+        peak_kb=peak_bytes / 1024,
+    )
+
+
+def measure(func, ids, samples, before=None):
+    """
+    Time `func(id)` over `samples` calls cycling through
+    `ids`, after one warm-up call, then trace one more call
+    for its peak memory. `before` runs untimed before each
+    call, to clear caches.
+    """
+    def call(id):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        func(id)
+        return (time.perf_counter() - start) * 1000
+
+    call(ids[0])
+    timings = [call(ids[i % len(ids)]) for i in range(samples)]
+
+    # Traced separately, as tracing slows every allocation
+    tracemalloc.start()
+    try:
+        call(ids[0])
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return summarize(timings, peak)
+
+
+def query_methods(model):
+    """
+    Every query method of `model`, as functions of an id.
+    """
+    return {
+        'names': lambda id: model.names(),
+        'search': lambda id: model.search('a'),
+        'username': model.username,
+        'event_counts': model.event_counts,
+        'cumulative_event_counts': model.cumulative_event_counts,
+        'model_data': model.model_data,
+        'notes': model.notes,
+        'notes_page': lambda id: model.notes_page(id, None, 25),
+        'search_notes': lambda id: model.search_notes('production', id=id),
+        'risk_score': model.risk_score,
+    }
+
+
+# Methods the dashboard answers from the event store
+STORE_METHODS = ['event_counts', 'cumulative_event_counts', 'model_data']
+
+
+def run_worker(database, samples, seed):
+    """
+    Benchmark `database` in this interpreter.
+    """
+    sys.path.insert(0, str(project_root / 'report'))
+    import dashboard
+    from employee_events import QueryBase, Employee, Team, EventStore, pool
+    from starlette.testclient import TestClient
+    from base_components import component_cache
+
+    database = Path(database)
+    pool.retarget(f"{database.resolve().as_uri()}?mode=ro")
+    store = EventStore(database)
+
+    rng = random.Random(seed)
+    models = {'employee': Employee(), 'team': Team()}
+    ids = {}
+    for name, model in models.items():
+        entity_ids = [row[0] for row in model.query(f"SELECT {name}_id FROM {name}")]
+        ids[name] = rng.sample(entity_ids, min(ENTITY_SAMPLE, len(entity_ids)))
+
+    results = {}
+
+    QueryBase.event_store = None
+    for name, model in models.items():
+        for method, func in query_methods(model).items():
+            results[f"{type(model).__name__}.{method}"] = measure(func, ids[name], samples)
+
+    QueryBase.event_store = store
+    store.reload()
+    for name, model in models.items():
+        methods = query_methods(model)
+        for method in STORE_METHODS:
+            results[f"{type(model).__name__}.{method}[store]"] = measure(
+                methods[method], ids[name], samples)
+
+    components = {
+        'LineChart': lambda component, model: lambda id: component.image_bytes(id, model),
+        'BarChart': lambda component, model: lambda id: component.image_bytes(id, model),
+        'NotesTable': lambda component, model: lambda id: component(id, model),
+        'ReportDropdown': lambda component, model: lambda id: component(id, model),
+    }
+    for component_name, bind in components.items():
+        component = getattr(dashboard, component_name)()
+        for name, model in models.items():
+            results[f"{component_name}[{name}]"] = measure(
+                bind(component, model), ids[name], samples,
+                before=component_cache.invalidate)
+
+    # Without a `with` block the client skips the startup
+    # hooks, so the app keeps reading the generated database
+    client = TestClient(dashboard.app)
+
+    def page(name):
+        def get(id):
+            response = client.get(f"/{name}/{id}")
+            response.raise_for_status()
+        return get
+
+    for name in models:
+        results[f"GET /{name}/{{id}}"] = measure(
+            page(name), ids[name], samples, before=component_cache.invalidate)
+
+    return dict(
+        benchmarks=results,
+        max_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+
+
+def benchmark(sizes=('small', 'medium'), samples=200, seed=0, data_dir=None):
+    data_dir = data_dir or Path(tempfile.gettempdir()) / 'employee-events-benchmarks'
+    results = {}
+    for size in sizes:
+        start = time.perf_counter()
+        database = build_database(size, seed, data_dir)
+        build_s = time.perf_counter() - start
+
+        # A fresh interpreter per size, so no connection,
+        # snapshot or cache carries over between databases
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', str(database),
+             '--samples', str(samples), '--seed', str(seed)],
+            cwd=project_root / 'report', stdout=subprocess.PIPE, text=True, check=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        result.update(database=str(database), build_s=build_s, **SIZES[size])
+        results[size] = result
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of messages for every benchmark whose
+    median latency or peak memory grew by more than
+    `tolerance` over its baseline.
+    """
+    regressions = []
+    for size, result in results.items():
+        if size not in baseline:
+            continue
+        for name, current in result['benchmarks'].items():
+            previous = baseline[size]['benchmarks'].get(name)
+            if previous is None:
+                continue
+            allowed = max(previous['p50_ms'] * (1 + tolerance),
+                          previous['p50_ms'] + NOISE_MS)
+            if current['p50_ms'] > allowed:
+                regressions.append(
+                    f"{size} {name}: p50 {current['p50_ms']:.2f}ms > {allowed:.2f}ms allowed")
+            allowed_kb = previous['peak_kb'] * (1 + tolerance)
+            if current['peak_kb'] > allowed_kb:
+                regressions.append(
+                    f"{size} {name}: peak {current['peak_kb']:.0f}KB > {allowed_kb:.0f}KB allowed")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES),
+                        default=['small', 'medium'])
+    parser.add_argument('--samples', type=sample_count, default=200,
+                        help=f"Timed calls per benchmark, p99 needs {P99_SAMPLES}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', type=Path,
+                        help="Where generated databases are cached")
+    parser.add_argument('--output', type=Path,
+                        help="Write the results to this JSON file")
+    parser.add_argument('--baseline', type=Path,
+                        help="Fail if slower than the results in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline")
+    parser.add_argument('--worker', metavar='DATABASE', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.samples, args.seed)))
+        return
+
+    results = benchmark(args.sizes, args.samples, args.seed, args.data_dir)
+
+    for size, result in results.items():
+        print(f"{size}: {result['employees']} employees, {result['teams']} teams "
+              f"(built in {result['build_s']:.1f}s, peak RSS {result['max_rss_mb']:.0f} MB)")
+        for name, timing in result['benchmarks'].items():
+            p99 = f"{timing['p99_ms']:8.2f}" if timing['p99_ms'] is not None else f"{'-':>8}"
+            print(f"  {name:<40} p50 {timing['p50_ms']:8.2f} ms  "
+                  f"p90 {timing['p90_ms']:8.2f}  p99 {p99}  "
+                  f"peak {timing['peak_kb']:8.0f} KB")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()),
+                              args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,34 @@
-from .employee import Employee
-from .team import Team
-from .query_base import QueryBase
-from .sql_execution import *
\ No newline at end of file
+from importlib import import_module
+
+# Public names are resolved on first access, so importing
+# the package does not pull in pandas or open the database
+_exports = {
+    'Employee': '.employee',
+    'Team': '.team',
+    'QueryBase': '.query_base',
+    'ConnectionPool': '.connection_pool',
+    'EventStore': '.event_store',
+    'Replica': '.replica',
+    'StagingDatabase': '.bulk_load',
+    'ingest': '.ingestion',
+    'QueryMixin': '.sql_execution',
+    'query': '.sql_execution',
+    'db_path': '.sql_execution',
+    'pool': '.sql_execution',
+    'query_executor': '.sql_execution',
+    'data_version': '.sql_execution',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Bulk loader that builds an employee_events database from
+chunks of rows and swaps it into place.
+
+Rows are written with `executemany` into a staging file next to
+the target, one large transaction per chunk, with the journal
+and fsyncs turned off. The keys and indexes are only created
+once every row is in, by running the migrations. Finally the
+staging file is renamed over the target in one atomic step, so
+readers see either the old database or the complete new one.
+
+Usage:
+    from employee_events.bulk_load import StagingDatabase
+
+    with StagingDatabase() as staging:
+        staging.load('team', [teams])
+        staging.load('employee', [employees])
+        staging.load('notes', [notes])
+        staging.load('employee_events', event_chunks)
+"""
+from sqlite3 import connect
+from pathlib import Path
+import os
+
+from .migrations import upgrade
+from .sql_execution import db_path, wal_stat
+
+# Columns of the raw tables the migrations start from,
+# in the order the rows of each chunk are read
+TABLES = {
+    'team': ['team_id', 'team_name', 'shift', 'manager_name'],
+    'employee': ['employee_id', 'first_name', 'last_name', 'team_id'],
+    'notes': ['employee_id', 'team_id', 'note', 'note_date'],
+    'employee_events': ['event_date', 'employee_id', 'team_id',
+                        'positive_events', 'negative_events'],
+}
+
+
+def chunk_rows(chunk, columns):
+    """
+    Returns the rows of a chunk as tuples of Python values.
+    A chunk is a dataframe holding `columns`, or any
+    iterable of rows already in that order.
+    """
+    if hasattr(chunk, 'columns'):
+        # Whole columns are converted at once, which is far
+        # quicker than converting each numpy scalar
+        return zip(*(chunk[column].tolist() for column in columns))
+    return chunk
+
+
+class StagingDatabase:
+    """
+    Staging copy of `database` that is filled with `load`
+    and replaces `database` when the `with` block exits
+    without an error. On an error the staging file is
+    deleted and `database` is left untouched.
+    """
+
+    def __init__(self, database=db_path, staging=None, timeout=30):
+        self.database = Path(database)
+        self.path = Path(staging or self.database.with_name(self.database.name + '.staging'))
+        # Seconds to wait for readers and writers of
+        # `database` before giving up on the swap
+        self.timeout = timeout
+        self.connection = None
+        self.upgraded = False
+
+    def __enter__(self):
+        self.path.unlink(missing_ok=True)
+        self.connection = connect(self.path, isolation_level=None)
+
+        # Nothing needs to survive a crash during the load,
+        # as the staging file is rebuilt from scratch
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+
+        for table, columns in TABLES.items():
+            self.connection.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        return self
+
+    def load(self, table, chunks):
+        """
+        Append every chunk of `chunks` to `table`, each
+        in one transaction. Returns the number of rows.
+        """
+        columns = TABLES[table]
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+
+        count = 0
+        for chunk in chunks:
+            self.connection.execute("BEGIN")
+            cursor = self.connection.executemany(sql, chunk_rows(chunk, columns))
+            self.connection.execute("COMMIT")
+            count += cursor.rowcount
+        return count
+
+    def upgrade(self):
+        """
+        Close the load and run the migrations, which declare
+        the keys, build the indexes and rollups and collect
+        planner statistics. Runs on exit if not called, and
+        must be called before writing to the migrated tables.
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if not self.upgraded:
+            upgrade(self.path)
+            self.upgraded = True
+
+    def swap(self):
+        """
+        Atomically replace `database` with the staging file.
+        The old database's write lock is held across the
+        rename, so no ingestion writes to it meanwhile.
+        Raises if its write-ahead log cannot be emptied.
+        """
+        if not self.database.exists():
+            os.replace(self.path, self.database)
+            return
+
+        connection = connect(self.database, timeout=self.timeout, isolation_level=None)
+        try:
+            # A `-wal` file left next to the old database would
+            # be replayed into the new one, so it must be empty.
+            # Outside WAL mode the checkpoint returns (0, -1, -1).
+            busy, log, checkpointed = connection.execute(
+                "PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            if busy or log > 0:
+                raise RuntimeError(
+                    f"Could not empty the write-ahead log of {self.database}, "
+                    f"it is in use ({busy}, {log}, {checkpointed})")
+
+            connection.execute("BEGIN IMMEDIATE")
+            if wal_stat(self.database) is not None:
+                raise RuntimeError(
+                    f"{self.database} was written to while it was being replaced")
+            os.replace(self.path, self.database)
+        finally:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            connection.close()
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            self.path.unlink(missing_ok=True)
+            return False
+
+        try:
+            self.upgrade()
+            self.swap()
+        except BaseException:
+            self.path.unlink(missing_ok=True)
+            raise
+        return False
@@ -0,0 +1,194 @@
+from sqlite3 import connect
+from contextlib import contextmanager
+from pathlib import Path
+import threading
+import time
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only sqlite3 connections.
+
+    Connections are opened lazily with `mode=ro` and
+    `query_only`, tuned with the `cache_size` and `mmap_size`
+    PRAGMAs, and handed back to the pool after use so the
+    schema is parsed once per connection instead of once
+    per query.
+    """
+
+    def __init__(self, database, size=4, timeout=5.0,
+                 cache_size=-16000, mmap_size=256 * 1024 * 1024,
+                 cached_statements=128):
+        self.database = database
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._size = size
+        self._target = None
+        self._idle = []
+        self._open = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._stats = dict(created=0, checkouts=0, reused=0,
+                           waits=0, timeouts=0, closed=0)
+
+    @property
+    def size(self):
+        return self._size
+
+    def resize(self, size):
+        """
+        Change the maximum number of open connections.
+        Idle connections above the new size are closed.
+        """
+        with self._cond:
+            self._size = size
+            while self._idle and self._open > self._size:
+                conn, _ = self._idle.pop(0)
+                self._close(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Returns a dictionary of pool counters
+        along with the current number of open,
+        idle and checked out connections.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                size=self._size,
+                open=self._open,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+            )
+        return stats
+
+    def uri(self):
+        if self._target is not None:
+            return self._target
+        return f"{Path(self.database).resolve().as_uri()}?mode=ro"
+
+    def retarget(self, uri=None):
+        """
+        Open connections to the sqlite `uri` from now on, or
+        to `database` again if `uri` is None. Connections to
+        the previous target finish their current query and
+        are closed when they are returned.
+        """
+        with self._cond:
+            self._target = uri
+            self._retire()
+
+    def _connect(self, target):
+        conn = connect(
+            target,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def _close(self, conn):
+        # Callers must hold `self._cond`
+        conn.close()
+        self._open -= 1
+        self._stats['closed'] += 1
+
+    def acquire(self):
+        """
+        Check out a `(connection, generation)` pair,
+        reusing an idle connection, opening a new one if
+        the pool has room, or waiting up to `timeout`
+        seconds for one to be released.
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        with self._cond:
+            self._stats['checkouts'] += 1
+            while True:
+                if self._idle:
+                    conn, generation = self._idle.pop()
+                    if generation != self._generation:
+                        # Opened before the last `reset`
+                        self._close(conn)
+                        continue
+                    self._stats['reused'] += 1
+                    return conn, generation
+
+                if self._open < self._size:
+                    self._open += 1
+                    generation = self._generation
+                    target = self.uri()
+                    break
+
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise TimeoutError(
+                        f"No database connection available "
+                        f"after {self.timeout}s")
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._connect(target)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats['created'] += 1
+        return conn, generation
+
+    def release(self, conn, generation):
+        """
+        Return a connection to the pool. Connections opened
+        before the last `reset`, or above the pool size,
+        are closed instead.
+        """
+        with self._cond:
+            if generation != self._generation or self._open > self._size:
+                self._close(conn)
+            else:
+                self._idle.append((conn, generation))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that checks out a connection
+        and always returns it to the pool.
+        """
+        conn, generation = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn, generation)
+
+    def reset(self):
+        """
+        Close every idle connection and retire the ones
+        currently checked out, e.g. after the database
+        file has been replaced on disk.
+        """
+        with self._cond:
+            self._retire()
+
+    def _retire(self):
+        # Callers must hold `self._cond`
+        self._generation += 1
+        while self._idle:
+            conn, _ = self._idle.pop()
+            self._close(conn)
+        self._cond.notify_all()
@@ -17,6 +17,47 @@ class Employee(QueryBase):
     # to the string "employee"
     name = "employee"
 
+    statements = {
+
+        # Query 3
+        # Select the full name and id
+        # of every employee in the database
+        'names': """
+            SELECT first_name || ' ' || last_name AS full_name, employee_id
+            FROM employee
+        """,
+
+        # Query 4
+        # Select the full name of the employee
+        # whose id is bound to the `?` parameter
+        'username': """
+            SELECT first_name || ' ' || last_name AS full_name
+            FROM employee
+            WHERE employee_id = ?
+        """,
+
+        # The first employees, by full name, whose
+        # lower-cased full name falls in the range
+        # bound to the `?` parameters
+        'search': """
+            SELECT first_name || ' ' || last_name AS full_name, employee_id
+            FROM employee
+            WHERE lower(first_name || ' ' || last_name) >= ?
+              AND lower(first_name || ' ' || last_name) < ?
+            ORDER BY lower(first_name || ' ' || last_name)
+            LIMIT ?
+        """,
+
+        # This SQL query generates the data needed for
+        # the machine learning model.
+        'model_data': """
+            SELECT SUM(positive_events) positive_events
+                    , SUM(negative_events) negative_events
+            FROM employee_totals
+            WHERE employee_id = ?
+        """,
+    }
+
 
     # Define a method called `names`
     # that receives no arguments
@@ -27,19 +68,7 @@ class Employee(QueryBase):
         Returns a list of tuples containing the names
         and ids of all employees in the database.
         """
-        
-        # Query 3
-        # Write an SQL query
-        # that selects two columns 
-        # 1. The employee's full name
-        # 2. The employee's id
-        # This query should return the data
-        # for all employees in the database
-        sql_query = """
-            SELECT first_name || ' ' || last_name AS full_name, employee_id
-            FROM employee
-        """
-        return self.query(sql_query)
+        return self.query(self.sql['names'])
     
 
     # Define a method called `username`
@@ -51,36 +80,19 @@ class Employee(QueryBase):
         Returns a list of tuples containing the full name
         and id of a specific employee in the database.
         """
-        
-        # Query 4
-        # Write an SQL query
-        # that selects an employees full name
-        # Use f-string formatting and a WHERE filter
-        # to only return the full name of the employee
-        # with an id equal to the id argument
-        sql_query = """
-            SELECT first_name || ' ' || last_name AS full_name
-            FROM employee
-            WHERE employee_id = {id}
-        """
-        return self.query(sql_query)
+        return self.query(self.sql['username'], (id,))
 
 
-    # Below is method with an SQL query
-    # This SQL query generates the data needed for
-    # the machine learning model.
-    # Without editing the query, alter this method
-    # so when it is called, a pandas dataframe
-    # is returns containing the execution of
-    # the sql query
+    # Returns a pandas dataframe containing
+    # the data needed for the machine learning model
     def model_data(self, id):
+        if self.event_store is not None:
+            return self.event_store.model_data(self.name, id)
+        return self.pandas_query(self.sql['model_data'], (id,))
 
-        sql_query = f"""
-            SELECT SUM(positive_events) positive_events
-                    , SUM(negative_events) negative_events
-            FROM {self.name}
-            JOIN employee_events
-                USING({self.name}_id)
-            WHERE {self.name}.{self.name}_id = {id}
-        """
-        return self.pandas_query(sql_query)
\ No newline at end of file
+    # Async counterparts of `username` and `model_data`
+    async def ausername(self, id):
+        return await self.aquery(self.sql['username'], (id,))
+
+    async def amodel_data(self, id):
+        return await self.run_async(self.model_data, id)
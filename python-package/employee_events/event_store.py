@@ -0,0 +1,217 @@
+"""
+In-process columnar copy of the `employee_events` table.
+
+`EventStore` loads every event once into NumPy arrays sorted
+by entity and date, and answers the event count and model data
+queries of `Employee` and `Team` by slicing those arrays, so
+they never reach SQLite. The store reloads itself when the
+database file changes.
+
+Enable it for every model with:
+
+    from employee_events import QueryBase, EventStore
+
+    QueryBase.event_store = EventStore()
+"""
+from sqlite3 import connect
+from pathlib import Path
+import threading
+
+import numpy as np
+
+from . import sql_execution
+from .sql_execution import db_path, data_version
+
+FEATURES = ['positive_events', 'negative_events']
+
+# Every event, with dates read as days since 1970-01-01
+EVENTS_SQL = """
+    SELECT employee_id,
+           team_id,
+           julianday(event_date) - julianday('1970-01-01'),
+           COALESCE(positive_events, 0),
+           COALESCE(negative_events, 0)
+    FROM employee_events
+"""
+
+
+def entity_key(id):
+    """
+    Returns `id` as an integer, or None when it is not one,
+    which matches no events just like it would in SQL.
+    """
+    try:
+        return int(id)
+    except (TypeError, ValueError):
+        return None
+
+
+class EntityIndex:
+    """
+    Events sorted by one entity id column and then by date,
+    with the offset of every entity's first and last event.
+    """
+
+    def __init__(self, keys, dates, employee_ids, positive, negative):
+        order = np.lexsort((dates, keys))
+        self.keys = keys[order]
+        self.dates = dates[order]
+        self.employee_ids = employee_ids[order]
+        self.counts = np.column_stack([positive[order], negative[order]])
+
+        self.ids, self.starts = np.unique(self.keys, return_index=True)
+        self.stops = np.append(self.starts[1:], len(self.keys))
+
+    def rows(self, id):
+        """
+        Returns the slice of rows holding the events of `id`.
+        """
+        if id is None:
+            return slice(0, 0)
+        position = np.searchsorted(self.ids, id)
+        if position == len(self.ids) or self.ids[position] != id:
+            return slice(0, 0)
+        return slice(self.starts[position], self.stops[position])
+
+    def daily_counts(self, id):
+        """
+        Returns the distinct event dates of `id` and the
+        positive and negative event sums of each date.
+        """
+        rows = self.rows(id)
+        dates = self.dates[rows]
+        if not len(dates):
+            return dates, self.counts[rows]
+
+        # The rows are sorted by date, so each
+        # date starts where the previous one changes
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+        return dates[starts], np.add.reduceat(self.counts[rows], starts)
+
+
+class Snapshot:
+    """
+    Immutable arrays loaded from one version of the database.
+    """
+
+    def __init__(self, version, employee_ids, team_ids, dates, positive, negative):
+        self.version = version
+        self.employee = EntityIndex(employee_ids, dates, employee_ids, positive, negative)
+        self.team = EntityIndex(team_ids, dates, employee_ids, positive, negative)
+
+    @classmethod
+    def load(cls, database):
+        # Read the version first, so a write that lands
+        # during the load triggers another reload
+        version = data_version(database)
+
+        # The packaged database is read through the shared
+        # pool, so the events come from the in-memory replica
+        # whose version `data_version` reports, when one runs
+        if Path(database) == sql_execution.db_path:
+            with sql_execution.pool.connection() as connection:
+                rows = connection.execute(EVENTS_SQL).fetchall()
+        else:
+            connection = connect(f"{Path(database).resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                rows = connection.execute(EVENTS_SQL).fetchall()
+            finally:
+                connection.close()
+
+        columns = np.array(rows, dtype=np.int64).reshape(-1, 5).T
+        employee_ids, team_ids, days, positive, negative = columns
+        return cls(version, employee_ids, team_ids,
+                   days.astype('datetime64[D]'), positive, negative)
+
+
+class EventStore:
+    """
+    Answers `event_counts`, `cumulative_event_counts` and
+    `model_data` for employees and teams from NumPy arrays.
+
+    The arrays are loaded on first use and reloaded whenever
+    `data_version` reports a new database file. A reload
+    builds a complete new snapshot before replacing the
+    current one, and requests arriving meanwhile keep
+    reading the previous snapshot.
+    """
+
+    def __init__(self, database=db_path):
+        self.database = database
+        self._snapshot = None
+        self._reload_lock = threading.Lock()
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        version = data_version(self.database)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        # Only one thread reloads. The others keep using the
+        # current snapshot, unless there is none to use yet.
+        if not self._reload_lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = Snapshot.load(self.database)
+            return self._snapshot
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """
+        Load the database now instead of on the next request.
+        """
+        with self._reload_lock:
+            self._snapshot = Snapshot.load(self.database)
+
+    def index(self, name):
+        return getattr(self.snapshot(), name)
+
+    def event_counts(self, name, id):
+        """
+        Same dataframe as `QueryBase.event_counts`.
+        """
+        dates, counts = self.index(name).daily_counts(entity_key(id))
+        return self._frame(dates, counts)
+
+    def cumulative_event_counts(self, name, id):
+        """
+        Same dataframe as `QueryBase.cumulative_event_counts`.
+        """
+        dates, counts = self.index(name).daily_counts(entity_key(id))
+        return self._frame(dates, np.cumsum(counts, axis=0))
+
+    def model_data(self, name, id):
+        """
+        Same dataframe as `Employee.model_data` and `Team.model_data`.
+        """
+        import pandas as pd
+
+        index = self.index(name)
+        rows = index.rows(entity_key(id))
+        counts = index.counts[rows]
+
+        if name == 'employee':
+            if not len(counts):
+                return pd.DataFrame([[None, None]], columns=FEATURES)
+            return pd.DataFrame([counts.sum(axis=0)], columns=FEATURES)
+
+        if not len(counts):
+            return pd.DataFrame(np.empty((0, 2), dtype=np.int64), columns=FEATURES)
+
+        # One row per employee of the team, by employee id
+        employee_ids = index.employee_ids[rows]
+        order = np.argsort(employee_ids, kind='stable')
+        employee_ids = employee_ids[order]
+        starts = np.flatnonzero(np.r_[True, employee_ids[1:] != employee_ids[:-1]])
+        return pd.DataFrame(np.add.reduceat(counts[order], starts), columns=FEATURES)
+
+    def _frame(self, dates, counts):
+        import pandas as pd
+
+        return pd.DataFrame({
+            'event_date': np.datetime_as_string(dates, unit='D').astype(object),
+            'positive_events': counts[:, 0],
+            'negative_events': counts[:, 1],
+        })
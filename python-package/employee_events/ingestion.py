@@ -0,0 +1,221 @@
+"""
+Incremental ingestion of events and notes into a live
+employee_events database.
+
+`ingest` appends batches of rows in one transaction with the
+database in WAL mode, so the dashboard keeps reading while
+new rows are written. Every batch is recorded in the
+`ingested_batches` table, which makes re-running one harmless,
+and events that contradict the stored counts for their day are
+refused. Every batch that adds rows bumps the `data_version`
+table, and the rollup and full-text search triggers keep the
+derived tables current.
+Stored risk scores stop being used once events are added, until
+they are recomputed with `--model` or `employee-events-score`.
+
+Usage:
+    python -m employee_events.ingestion [--events events.csv]
+        [--notes notes.csv] [--batch-id ID] [--model model.pkl]
+        [path/to/employee_events.db]
+
+The CSV files need a header with the columns of
+`employee_events` or `notes` (without `note_id`).
+"""
+from sqlite3 import connect
+from pathlib import Path
+import argparse
+import csv
+import hashlib
+
+from .bulk_load import TABLES, chunk_rows
+from .migrations import latest_version, schema_version
+from .risk_scores import refresh
+from .sql_execution import db_path, stored_version
+
+
+def connect_writer(database=db_path, timeout=30):
+    """
+    Open a connection for writing, switching the database
+    to WAL mode so readers are never blocked by it.
+    """
+    connection = connect(database, timeout=timeout, isolation_level=None)
+    try:
+        if schema_version(connection) != latest_version():
+            raise RuntimeError(
+                f"{database} is not at schema version {latest_version()}, "
+                "run `python -m employee_events.migrations` first")
+        connection.execute("PRAGMA journal_mode = WAL")
+        # In WAL mode a commit is still atomic without
+        # an fsync, it is only the last commits that may
+        # be lost on a power failure
+        connection.execute("PRAGMA synchronous = NORMAL")
+    except Exception:
+        connection.close()
+        raise
+    return connection
+
+
+def batch_identity(events, notes):
+    """
+    Returns a hash of the rows of a batch, which
+    identifies it when no batch id is given.
+    """
+    digest = hashlib.sha256(repr((events, notes)).encode())
+    return digest.hexdigest()[:32]
+
+
+def event_conflicts(connection):
+    """
+    Returns the (employee_id, event_date) of every incoming
+    event whose counts or team differ from the stored row
+    for that day, or from another incoming row for it.
+    """
+    return connection.execute("""
+        SELECT incoming.employee_id, incoming.event_date
+        FROM incoming_events AS incoming
+        JOIN employee_events AS stored USING (employee_id, event_date)
+        WHERE incoming.team_id IS NOT stored.team_id
+           OR incoming.positive_events IS NOT stored.positive_events
+           OR incoming.negative_events IS NOT stored.negative_events
+        UNION
+        SELECT employee_id, event_date
+        FROM incoming_events
+        GROUP BY employee_id, event_date
+        HAVING COUNT(DISTINCT json_array(team_id, positive_events, negative_events)) > 1
+        ORDER BY 1, 2
+    """).fetchall()
+
+
+def ingest(events=(), notes=(), database=db_path, rescore=None, batch_id=None):
+    """
+    Append `events` and `notes` rows to the database as one
+    batch. Each is a dataframe or an iterable of rows in the
+    column order of `bulk_load.TABLES`.
+
+    A batch is identified by `batch_id`, or by a hash of its
+    rows, and one that was already ingested is skipped. An
+    event for a day that is already stored with the same
+    counts is skipped too, but one with different counts
+    raises a ValueError and nothing is added.
+
+    `rescore`, if given, is called with the database once
+    rows were added, to recompute what is derived from them
+    outside SQL such as the risk scores.
+
+    Returns the number of events and notes added, the
+    resulting data version, the batch id and whether the
+    batch was skipped.
+    """
+    events = [tuple(row) for row in chunk_rows(events, TABLES['employee_events'])]
+    notes = [tuple(row) for row in chunk_rows(notes, TABLES['notes'])]
+    batch_id = batch_id or batch_identity(events, notes)
+
+    connection = connect_writer(database)
+    try:
+        # Take the write lock up front, so concurrent
+        # ingestions queue instead of failing mid-batch
+        connection.execute("BEGIN IMMEDIATE")
+        if connection.execute("SELECT 1 FROM ingested_batches WHERE batch_id = ?",
+                              (batch_id,)).fetchone():
+            version = stored_version(connection)
+            connection.execute("ROLLBACK")
+            return dict(events=0, notes=0, version=version,
+                        batch=batch_id, skipped=True)
+
+        # Incoming events are staged with the column types of
+        # the table, so CSV strings compare like stored values
+        columns = ', '.join(TABLES['employee_events'])
+        connection.execute(
+            "CREATE TEMP TABLE incoming_events AS SELECT * FROM employee_events WHERE 0")
+        connection.executemany(
+            f"INSERT INTO incoming_events ({columns}) VALUES (?, ?, ?, ?, ?)", events)
+
+        conflicts = event_conflicts(connection)
+        if conflicts:
+            employee_id, event_date = conflicts[0]
+            raise ValueError(
+                f"{len(conflicts)} events conflict with the stored counts, "
+                f"the first for employee {employee_id} on {event_date}")
+
+        added = {}
+        added['employee_events'] = connection.execute(f"""
+            INSERT INTO employee_events ({columns})
+            SELECT DISTINCT {columns} FROM incoming_events AS incoming
+            WHERE NOT EXISTS (
+                SELECT 1 FROM employee_events AS stored
+                WHERE stored.employee_id = incoming.employee_id
+                  AND stored.event_date = incoming.event_date
+            )
+        """).rowcount
+        added['notes'] = len(notes)
+        connection.executemany(
+            f"INSERT INTO notes ({', '.join(TABLES['notes'])}) VALUES (?, ?, ?, ?)", notes)
+
+        if any(added.values()):
+            connection.execute("""
+                UPDATE data_version
+                SET version = version + 1, updated_at = datetime('now')
+                WHERE id = 1
+            """)
+        version = stored_version(connection)
+        connection.execute(
+            "INSERT INTO ingested_batches VALUES (?, ?, ?, ?, datetime('now'))",
+            (batch_id, added['employee_events'], added['notes'], version))
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+    if rescore is not None and any(added.values()):
+        rescore(database)
+
+    return dict(events=added['employee_events'], notes=added['notes'],
+                version=version, batch=batch_id, skipped=False)
+
+
+def read_csv(path, table):
+    """
+    Returns the rows of a CSV file with a header,
+    in the column order of `table`.
+    """
+    with Path(path).open(newline='') as file:
+        reader = csv.DictReader(file)
+        return [tuple(row[column] for column in TABLES[table]) for row in reader]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Append events and notes to an employee_events database.")
+    parser.add_argument(
+        'database', nargs='?', default=db_path, type=Path,
+        help="Path to the sqlite file (defaults to the packaged database)")
+    parser.add_argument('--events', type=Path, help="CSV file of employee_events rows")
+    parser.add_argument('--notes', type=Path, help="CSV file of notes rows")
+    parser.add_argument('--batch-id',
+                        help="Identity of the batch, a hash of its rows by default")
+    parser.add_argument('--model', type=Path,
+                        help="Pickled model to recompute the risk scores with")
+    args = parser.parse_args(argv)
+
+    if args.events is None and args.notes is None:
+        parser.error("nothing to ingest, pass --events and/or --notes")
+
+    result = ingest(
+        events=read_csv(args.events, 'employee_events') if args.events else (),
+        notes=read_csv(args.notes, 'notes') if args.notes else (),
+        database=args.database,
+        rescore=(lambda database: refresh(args.model, database)) if args.model else None,
+        batch_id=args.batch_id,
+    )
+    if result['skipped']:
+        print(f"Batch {result['batch']} was already ingested into {args.database}")
+        return
+    print(f"Added {result['events']} events and {result['notes']} notes "
+          f"to {args.database}, data version {result['version']}")
+
+
+if __name__ == "__main__":
+    main()
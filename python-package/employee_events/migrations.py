@@ -0,0 +1,363 @@
+"""
+Versioned schema migrations for the employee_events database.
+
+The schema version is stored in sqlite's `user_version`
+PRAGMA. Each migration runs inside its own transaction and
+bumps `user_version` on success, so `upgrade` can be run
+repeatedly against the same file and only applies what is
+missing.
+
+Usage:
+    python -m employee_events.migrations [path/to/employee_events.db]
+"""
+from sqlite3 import connect
+from pathlib import Path
+import argparse
+
+from .sql_execution import db_path
+
+
+# Each migration is a (version, description, sql script) tuple.
+# Never edit a migration once it has shipped; append a new one.
+MIGRATIONS = [
+    (1, "primary keys and covering indexes", """
+        -- Rebuild the tables written by `DataFrame.to_sql`
+        -- with declared primary keys and without the pandas
+        -- `index` column.
+        CREATE TABLE team_new (
+            team_id INTEGER PRIMARY KEY,
+            team_name TEXT,
+            shift TEXT,
+            manager_name TEXT
+        );
+        INSERT INTO team_new (team_id, team_name, shift, manager_name)
+            SELECT team_id, team_name, shift, manager_name FROM team;
+        DROP TABLE team;
+        ALTER TABLE team_new RENAME TO team;
+
+        CREATE TABLE employee_new (
+            employee_id INTEGER PRIMARY KEY,
+            first_name TEXT,
+            last_name TEXT,
+            team_id INTEGER REFERENCES team (team_id)
+        );
+        INSERT INTO employee_new (employee_id, first_name, last_name, team_id)
+            SELECT employee_id, first_name, last_name, team_id FROM employee;
+        DROP TABLE employee;
+        ALTER TABLE employee_new RENAME TO employee;
+
+        -- Events are clustered by (employee_id, event_date), so the
+        -- primary key doubles as the covering index for every
+        -- per-employee lookup. Duplicate rows produced by joining
+        -- several notes onto the same day are dropped.
+        CREATE TABLE employee_events_new (
+            event_date TEXT NOT NULL,
+            employee_id INTEGER NOT NULL REFERENCES employee (employee_id),
+            team_id INTEGER NOT NULL REFERENCES team (team_id),
+            positive_events INTEGER NOT NULL DEFAULT 0,
+            negative_events INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (employee_id, event_date)
+        ) WITHOUT ROWID;
+        INSERT OR IGNORE INTO employee_events_new
+            (event_date, employee_id, team_id, positive_events, negative_events)
+            SELECT event_date, employee_id, team_id,
+                   COALESCE(positive_events, 0), COALESCE(negative_events, 0)
+            FROM employee_events
+            ORDER BY employee_id, event_date;
+        DROP TABLE employee_events;
+        ALTER TABLE employee_events_new RENAME TO employee_events;
+
+        CREATE INDEX employee_events_team_cover
+            ON employee_events (team_id, event_date, employee_id,
+                                positive_events, negative_events);
+
+        CREATE TABLE notes_new (
+            note_id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL REFERENCES employee (employee_id),
+            team_id INTEGER NOT NULL REFERENCES team (team_id),
+            note TEXT,
+            note_date TEXT
+        );
+        INSERT INTO notes_new (employee_id, team_id, note, note_date)
+            SELECT employee_id, team_id, note, note_date FROM notes
+            ORDER BY note_date;
+        DROP TABLE notes;
+        ALTER TABLE notes_new RENAME TO notes;
+
+        CREATE INDEX notes_employee_date ON notes (employee_id, note_date);
+        CREATE INDEX notes_team_date ON notes (team_id, note_date);
+    """),
+    (2, "daily, cumulative and lifetime rollups", """
+        -- Materialized aggregates read by `event_counts`,
+        -- `cumulative_event_counts` and `model_data`.
+        -- They are backfilled here and kept current by the
+        -- `employee_events_rollup` trigger as rows are inserted.
+        CREATE TABLE employee_daily_events (
+            employee_id INTEGER NOT NULL,
+            event_date TEXT NOT NULL,
+            positive_events INTEGER NOT NULL DEFAULT 0,
+            negative_events INTEGER NOT NULL DEFAULT 0,
+            cumulative_positive_events INTEGER NOT NULL DEFAULT 0,
+            cumulative_negative_events INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (employee_id, event_date)
+        ) WITHOUT ROWID;
+        INSERT INTO employee_daily_events
+            SELECT employee_id, event_date,
+                   SUM(positive_events), SUM(negative_events),
+                   SUM(SUM(positive_events)) OVER running,
+                   SUM(SUM(negative_events)) OVER running
+            FROM employee_events
+            GROUP BY employee_id, event_date
+            WINDOW running AS (PARTITION BY employee_id ORDER BY event_date);
+
+        CREATE TABLE team_daily_events (
+            team_id INTEGER NOT NULL,
+            event_date TEXT NOT NULL,
+            positive_events INTEGER NOT NULL DEFAULT 0,
+            negative_events INTEGER NOT NULL DEFAULT 0,
+            cumulative_positive_events INTEGER NOT NULL DEFAULT 0,
+            cumulative_negative_events INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (team_id, event_date)
+        ) WITHOUT ROWID;
+        INSERT INTO team_daily_events
+            SELECT team_id, event_date,
+                   SUM(positive_events), SUM(negative_events),
+                   SUM(SUM(positive_events)) OVER running,
+                   SUM(SUM(negative_events)) OVER running
+            FROM employee_events
+            GROUP BY team_id, event_date
+            WINDOW running AS (PARTITION BY team_id ORDER BY event_date);
+
+        CREATE TABLE employee_totals (
+            team_id INTEGER NOT NULL,
+            employee_id INTEGER NOT NULL,
+            positive_events INTEGER NOT NULL DEFAULT 0,
+            negative_events INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (team_id, employee_id)
+        ) WITHOUT ROWID;
+        INSERT INTO employee_totals
+            SELECT team_id, employee_id,
+                   SUM(positive_events), SUM(negative_events)
+            FROM employee_events
+            GROUP BY team_id, employee_id;
+        CREATE INDEX employee_totals_employee ON employee_totals (employee_id);
+
+        CREATE TRIGGER employee_events_rollup
+        AFTER INSERT ON employee_events
+        BEGIN
+            INSERT INTO employee_daily_events VALUES (
+                NEW.employee_id, NEW.event_date,
+                NEW.positive_events, NEW.negative_events,
+                NEW.positive_events + COALESCE((
+                    SELECT cumulative_positive_events FROM employee_daily_events
+                    WHERE employee_id = NEW.employee_id AND event_date < NEW.event_date
+                    ORDER BY event_date DESC LIMIT 1), 0),
+                NEW.negative_events + COALESCE((
+                    SELECT cumulative_negative_events FROM employee_daily_events
+                    WHERE employee_id = NEW.employee_id AND event_date < NEW.event_date
+                    ORDER BY event_date DESC LIMIT 1), 0)
+            )
+            ON CONFLICT (employee_id, event_date) DO UPDATE SET
+                positive_events = positive_events + excluded.positive_events,
+                negative_events = negative_events + excluded.negative_events,
+                cumulative_positive_events =
+                    cumulative_positive_events + excluded.positive_events,
+                cumulative_negative_events =
+                    cumulative_negative_events + excluded.negative_events;
+
+            -- Backfilling an earlier day shifts every later running total
+            UPDATE employee_daily_events SET
+                cumulative_positive_events =
+                    cumulative_positive_events + NEW.positive_events,
+                cumulative_negative_events =
+                    cumulative_negative_events + NEW.negative_events
+            WHERE employee_id = NEW.employee_id AND event_date > NEW.event_date;
+
+            INSERT INTO team_daily_events VALUES (
+                NEW.team_id, NEW.event_date,
+                NEW.positive_events, NEW.negative_events,
+                NEW.positive_events + COALESCE((
+                    SELECT cumulative_positive_events FROM team_daily_events
+                    WHERE team_id = NEW.team_id AND event_date < NEW.event_date
+                    ORDER BY event_date DESC LIMIT 1), 0),
+                NEW.negative_events + COALESCE((
+                    SELECT cumulative_negative_events FROM team_daily_events
+                    WHERE team_id = NEW.team_id AND event_date < NEW.event_date
+                    ORDER BY event_date DESC LIMIT 1), 0)
+            )
+            ON CONFLICT (team_id, event_date) DO UPDATE SET
+                positive_events = positive_events + excluded.positive_events,
+                negative_events = negative_events + excluded.negative_events,
+                cumulative_positive_events =
+                    cumulative_positive_events + excluded.positive_events,
+                cumulative_negative_events =
+                    cumulative_negative_events + excluded.negative_events;
+
+            -- Backfilling an earlier day shifts every later running total
+            UPDATE team_daily_events SET
+                cumulative_positive_events =
+                    cumulative_positive_events + NEW.positive_events,
+                cumulative_negative_events =
+                    cumulative_negative_events + NEW.negative_events
+            WHERE team_id = NEW.team_id AND event_date > NEW.event_date;
+
+            INSERT INTO employee_totals VALUES (
+                NEW.team_id, NEW.employee_id,
+                NEW.positive_events, NEW.negative_events
+            )
+            ON CONFLICT (team_id, employee_id) DO UPDATE SET
+                positive_events = positive_events + excluded.positive_events,
+                negative_events = negative_events + excluded.negative_events;
+        END;
+    """),
+    (3, "precomputed recruitment risk scores", """
+        -- Written by `employee_events.risk_scores.score_all`.
+        -- Every row records the model and the event totals
+        -- it was computed from, so stale scores are detected.
+        CREATE TABLE risk_scores (
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            model_version TEXT NOT NULL,
+            events_version TEXT NOT NULL,
+            PRIMARY KEY (entity, entity_id)
+        ) WITHOUT ROWID;
+    """),
+    (4, "name prefix search indexes", """
+        -- Serve `QueryBase.search` with a range scan over
+        -- the lower-cased names. The expressions must match
+        -- the ones in the `search` statements exactly.
+        CREATE INDEX employee_name_search
+            ON employee (lower(first_name || ' ' || last_name));
+        CREATE INDEX team_name_search
+            ON team (lower(team_name));
+    """),
+    (5, "full-text search over notes", """
+        -- External content FTS5 index of `notes.note`, read by
+        -- `QueryBase.search_notes`. The triggers below keep it
+        -- in step with every change to `notes`.
+        CREATE VIRTUAL TABLE notes_search USING fts5 (
+            note,
+            content = 'notes',
+            content_rowid = 'note_id',
+            tokenize = 'porter unicode61'
+        );
+        INSERT INTO notes_search (notes_search) VALUES ('rebuild');
+
+        CREATE TRIGGER notes_search_insert AFTER INSERT ON notes
+        BEGIN
+            INSERT INTO notes_search (rowid, note)
+                VALUES (NEW.note_id, NEW.note);
+        END;
+
+        CREATE TRIGGER notes_search_delete AFTER DELETE ON notes
+        BEGIN
+            INSERT INTO notes_search (notes_search, rowid, note)
+                VALUES ('delete', OLD.note_id, OLD.note);
+        END;
+
+        CREATE TRIGGER notes_search_update AFTER UPDATE OF note ON notes
+        BEGIN
+            INSERT INTO notes_search (notes_search, rowid, note)
+                VALUES ('delete', OLD.note_id, OLD.note);
+            INSERT INTO notes_search (rowid, note)
+                VALUES (NEW.note_id, NEW.note);
+        END;
+    """),
+    (6, "data version marker", """
+        -- Bumped by every ingestion that adds rows, for
+        -- caches outside this process to invalidate on.
+        CREATE TABLE data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        INSERT INTO data_version VALUES (1, 0, datetime('now'));
+    """),
+    (7, "ingested batches", """
+        -- Databases migrated by an earlier version 6 identify
+        -- notes by their employee, date and text, which
+        -- forbids two identical notes. Batches identify
+        -- ingested rows instead.
+        DROP INDEX IF EXISTS notes_identity;
+
+        -- Every batch `employee_events.ingestion` has added,
+        -- so running one again is a no-op.
+        CREATE TABLE ingested_batches (
+            batch_id TEXT PRIMARY KEY,
+            events INTEGER NOT NULL,
+            notes INTEGER NOT NULL,
+            data_version INTEGER NOT NULL,
+            ingested_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """),
+]
+
+
+def schema_version(connection):
+    """
+    Returns the schema version of an open connection.
+    """
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def upgrade(database=db_path, target=None):
+    """
+    Apply every pending migration to the database
+    file in place, then refresh the planner statistics
+    and compact the file.
+    Returns the list of versions that were applied.
+    """
+    target = latest_version() if target is None else target
+    applied = []
+
+    connection = connect(database, isolation_level=None)
+    try:
+        current = schema_version(connection)
+        for version, description, script in MIGRATIONS:
+            if version <= current or version > target:
+                continue
+            connection.executescript(
+                f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+            applied.append(version)
+
+        if applied:
+            connection.execute("ANALYZE")
+            connection.execute("PRAGMA optimize")
+            # Reclaim the pages freed by rebuilt tables
+            connection.execute("VACUUM")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Upgrade an employee_events database in place.")
+    parser.add_argument(
+        'database', nargs='?', default=db_path, type=Path,
+        help="Path to the sqlite file (defaults to the packaged database)")
+    parser.add_argument(
+        '--target', type=int, default=None,
+        help="Stop after this schema version")
+    args = parser.parse_args(argv)
+
+    applied = upgrade(args.database, args.target)
+    if applied:
+        print(f"Applied migrations {applied} to {args.database}")
+    else:
+        print(f"{args.database} is already up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
 # Import any dependencies needed to execute sql queries
 from .sql_execution import QueryMixin
+from .risk_scores import EVENTS_VERSION
+import re
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query matching notes that
+    contain every word. Quoting each word keeps FTS5
+    operators and punctuation typed by users from being
+    parsed as query syntax.
+    """
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
 
 # Define a class called QueryBase
 # Use inheritance to add methods
@@ -15,6 +27,124 @@ class QueryBase(QueryMixin):
     # set the attribute to an empty string
     name = ""
 
+    # SQL statements shared by every subclass.
+    # Subclasses add their own statements the same way.
+    # `{name}` is filled in with the subclass's `name`
+    # once, when the subclass is created, and every
+    # value is bound through a `?` parameter so each
+    # statement keeps the same text for every id.
+    statements = {
+
+        # QUERY 1
+        # Daily sums of positive and negative events
+        # for one employee or team, read from the
+        # rollup maintained by the database
+        'event_counts': """
+            SELECT event_date,
+                   positive_events,
+                   negative_events
+            FROM {name}_daily_events
+            WHERE {name}_id = ?
+            ORDER BY event_date
+        """,
+
+        # Running totals of the daily sums above
+        'cumulative_event_counts': """
+            SELECT event_date,
+                   cumulative_positive_events positive_events,
+                   cumulative_negative_events negative_events
+            FROM {name}_daily_events
+            WHERE {name}_id = ?
+            ORDER BY event_date
+        """,
+
+        # QUERY 2
+        # Return `note_date`, and `note`
+        # from the `notes` table
+        # for one employee or team
+        'notes': """
+            SELECT
+                note_date,
+                note
+            FROM notes
+            JOIN {name}
+            USING ({name}_id)
+            WHERE {name}.{name}_id = ?
+            ORDER BY note_date, note_id
+        """,
+
+        # One page of the notes above, starting after
+        # the (note_date, note_id) of the previous page's
+        # last row. Notes without a date sort first, so a
+        # NULL cursor date is followed by every dated note.
+        # The order is the one the `notes_{name}_date` index
+        # is stored in, so no page sorts the entity's notes.
+        'notes_page': """
+            SELECT
+                note_date,
+                note,
+                note_id
+            FROM notes
+            WHERE {name}_id = ?
+              AND (note_date > ?
+                   OR (note_date IS ? AND note_id > ?)
+                   OR (? IS NULL AND note_date IS NOT NULL))
+            ORDER BY note_date, note_id
+            LIMIT ?
+        """,
+
+        # The notes whose text matches an FTS5 query, best
+        # match first, optionally limited to one employee or
+        # team and to a date range. Each filter is skipped
+        # when its first `?` is bound to NULL.
+        'search_notes': """
+            SELECT
+                notes.note_date,
+                employee.first_name || ' ' || employee.last_name AS employee,
+                team.team_name AS team,
+                notes.note
+            FROM notes_search
+            JOIN notes ON notes.note_id = notes_search.rowid
+            JOIN employee USING (employee_id)
+            JOIN team ON team.team_id = notes.team_id
+            WHERE notes_search MATCH ?
+              AND (? IS NULL OR notes.{name}_id = ?)
+              AND (? IS NULL OR notes.note_date >= ?)
+              AND (? IS NULL OR notes.note_date <= ?)
+            ORDER BY bm25(notes_search)
+            LIMIT ?
+        """,
+
+        # Precomputed recruitment risk
+        # for one employee or team, unless events
+        # were added after it was computed
+        'risk_score': f"""
+            SELECT score
+            FROM risk_scores
+            WHERE entity = '{{name}}' AND entity_id = ?
+              AND events_version = ({EVENTS_VERSION})
+        """,
+    }
+
+    # The subclass's statements with `{name}` filled in
+    sql = {}
+
+    # Set to an `event_store.EventStore` to answer the
+    # event count and model data queries from memory
+    event_store = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        statements = {}
+        for base in reversed(cls.__mro__):
+            statements.update(vars(base).get('statements', {}))
+
+        cls.sql = {
+            key: statement.format(name=cls.name)
+            for key, statement in statements.items()
+        }
+
     # Define a `names` method that receives
     # no passed arguments
     def names(self):
@@ -22,11 +152,36 @@ class QueryBase(QueryMixin):
         Returns a list of tuples containing the names
         and ids of all employees or teams in the database.
         """
-        
+
         # Return an empty list
         return []
 
 
+    def search(self, prefix: str, limit: int = 10):
+        """
+        Returns a list of (name, id) tuples for at most `limit`
+        employees or teams whose name starts with `prefix`,
+        ignoring case, in alphabetical order.
+        """
+        if 'search' not in self.sql:
+            return []
+
+        # sqlite's lower() only folds ASCII letters,
+        # so the prefix is folded the same way
+        prefix = ''.join(
+            char.lower() if char.isascii() else char
+            for char in prefix.strip()
+        )
+
+        # Every name starting with the prefix sorts between
+        # the prefix and the prefix followed by the last
+        # code point, which lets sqlite scan the index range
+        return self.query(
+            self.sql['search'],
+            (prefix, prefix + '\U0010ffff', limit),
+        )
+
+
     # Define an `event_counts` method
     # that receives an `id` argument
     # This method should return a pandas dataframe
@@ -37,29 +192,21 @@ class QueryBase(QueryMixin):
         The dataframe includes the event date, positive events,
         and negative events.
         """
+        if self.event_store is not None:
+            return self.event_store.event_counts(self.name, id)
+        return self.pandas_query(self.sql['event_counts'], (id,))
 
-        # QUERY 1
-        # Write an SQL query that groups by `event_date`
-        # and sums the number of positive and negative events
-        # Use f-string formatting to set the FROM {table}
-        # to the `name` class attribute
-        # Use f-string formatting to set the name
-        # of id columns used for joining
-        # order by the event_date column
-        sql_query = f"""
-            SELECT event_date, 
-                   SUM(positive_events) positive_events,
-                   SUM(negative_events) negative_events
-            FROM {self.name}
-            JOIN employee_events USING({self.name}_id)
-            WHERE {self.name}.{self.name}_id = {id}
-            GROUP BY event_date
-            ORDER BY event_date
+    def cumulative_event_counts(self, id: int):
         """
+        Returns a pandas dataframe containing the cumulative
+        event counts for a specific employee or team.
+        The dataframe has the same columns as `event_counts`.
+        """
+        if self.event_store is not None:
+            return self.event_store.cumulative_event_counts(self.name, id)
+        return self.pandas_query(self.sql['cumulative_event_counts'], (id,))
+
 
-        return self.pandas_query(sql_query)
-            
-    
 
     # Define a `notes` method that receives an id argument
     # This function should return a pandas dataframe
@@ -69,22 +216,89 @@ class QueryBase(QueryMixin):
         for a specific employee or team.
         The dataframe includes the note date and the note text.
         """
+        return self.pandas_query(self.sql['notes'], (id,))
 
-        # QUERY 2
-        # Write an SQL query that returns `note_date`, and `note`
-        # from the `notes` table
-        # Set the joined table names and id columns
-        # with f-string formatting
-        # so the query returns the notes
-        # for the table name in the `name` class attribute
-        sql_query = f"""
-            SELECT 
-                note_date, 
-                note
-            FROM notes
-            JOIN {self.name}
-            USING ({self.name}_id)
-            WHERE {self.name}.{self.name}_id = {id}
+    def notes_page(self, id: int, after=None, limit: int = 50):
+        """
+        Returns a page of at most `limit` notes for a specific
+        employee or team, ordered like `notes`, along with the
+        cursor of the page that follows. `after` is the cursor
+        returned for the previous page, or None for the first
+        page. The returned cursor is None on the last page.
+        """
+        note_date, note_id = after if after else (None, 0)
+        # Cursors travel in query strings, where
+        # an undated note's date is empty
+        note_date = note_date or None
+
+        # Fetch one extra row to learn if another page follows
+        df = self.pandas_query(
+            self.sql['notes_page'],
+            (id, note_date, note_date, int(note_id), note_date, limit + 1),
+        )
+
+        cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            last_date = df['note_date'].iat[-1]
+            cursor = (last_date if isinstance(last_date, str) else '',
+                      int(df['note_id'].iat[-1]))
+
+        return df[['note_date', 'note']], cursor
+
+    def search_notes(self, query: str, id=None, since=None, until=None,
+                     limit: int = 50):
+        """
+        Returns a pandas dataframe of at most `limit` notes
+        containing every word of `query`, or a word with the
+        same stem, best match first. `id` limits the
+        search to one employee or team, and `since` and `until`
+        to notes dated within that range (inclusive, ISO dates).
+        The dataframe has the note date, the employee's name,
+        the team's name and the note text.
+        """
+        match = fts_query(query)
+        if not match:
+            match = '""'
+
+        return self.pandas_query(
+            self.sql['search_notes'],
+            (match, id, id, since, since, until, until, limit),
+        )
+
+    def risk_score(self, id: int):
+        """
+        Returns the precomputed recruitment risk
+        for a specific employee or team, or None if
+        it has not been scored since the last events
+        were added.
         """
-        return self.pandas_query(sql_query)
+        rows = self.query(self.sql['risk_score'], (id,))
+        return rows[0][0] if rows else None
+
+    # Async counterparts of the methods above.
+    # Each runs its blocking query on the query executor.
+    async def anames(self):
+        return await self.run_async(self.names)
+
+    async def asearch(self, prefix: str, limit: int = 10):
+        return await self.run_async(self.search, prefix, limit)
+
+    async def aevent_counts(self, id: int):
+        return await self.run_async(self.event_counts, id)
+
+    async def acumulative_event_counts(self, id: int):
+        return await self.run_async(self.cumulative_event_counts, id)
+
+    async def anotes(self, id: int):
+        return await self.apandas_query(self.sql['notes'], (id,))
+
+    async def anotes_page(self, id: int, after=None, limit: int = 50):
+        return await self.run_async(self.notes_page, id, after, limit)
+
+    async def asearch_notes(self, query: str, id=None, since=None, until=None,
+                            limit: int = 50):
+        return await self.run_async(self.search_notes, query, id, since, until, limit)
 
+    async def arisk_score(self, id: int):
+        return await self.run_async(self.risk_score, id)
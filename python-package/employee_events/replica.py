@@ -0,0 +1,161 @@
+"""
+In-memory replica of the employee_events database.
+
+`Replica` copies the database file into a shared-cache
+in-memory database with sqlite's backup API and points the
+connection pool at it, so queries never wait on disk reads.
+A background thread watches the file and, once a rewrite has
+settled, builds a fresh replica and swaps the pool over to it
+in one step. Queries already running finish on the replica
+they started on, and a replica is only swapped in after it
+has been checked to hold a complete, migrated database.
+
+Usage:
+    from employee_events.replica import Replica
+
+    replica = Replica().start()
+    ...
+    replica.stop()
+"""
+from sqlite3 import connect
+from pathlib import Path
+import itertools
+import logging
+import threading
+
+from . import sql_execution
+from .migrations import latest_version, schema_version
+
+logger = logging.getLogger(__name__)
+
+# Tables every replica must contain before it is used
+REQUIRED_TABLES = {'employee', 'team', 'employee_events', 'notes'}
+
+_names = itertools.count()
+
+
+class Replica:
+    """
+    Keeps `pool` reading an in-memory copy of `database`,
+    checking the file for changes every `interval` seconds.
+    """
+
+    def __init__(self, database=None, pool=None, interval=1.0):
+        self.database = database or sql_execution.db_path
+        self.pool = pool or sql_execution.pool
+        self.interval = interval
+
+        # Version of the file the current replica was copied
+        # from, and its `data_version`, which adds the marker
+        self.file_version = None
+        self.version = None
+        self._keeper = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def build(self):
+        """
+        Copy the database into a new in-memory database.
+        Returns its uri, a connection that keeps it alive and
+        the file version it was copied from, or None if the
+        file changed during the copy or is not a complete
+        database yet.
+        """
+        version = sql_execution.file_version(self.database)
+        uri = f"file:employee_events_replica_{next(_names)}?mode=memory&cache=shared"
+        keeper = connect(uri, uri=True, check_same_thread=False)
+
+        try:
+            source = connect(f"{Path(self.database).resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                source.backup(keeper)
+            finally:
+                source.close()
+
+            tables = {row[0] for row in keeper.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            complete = (
+                REQUIRED_TABLES <= tables
+                and schema_version(keeper) == latest_version()
+                and sql_execution.file_version(self.database) == version
+            )
+        except Exception:
+            keeper.close()
+            raise
+
+        if not complete:
+            keeper.close()
+            return None
+        return uri, keeper, version
+
+    def refresh(self):
+        """
+        Build a replica of the current file and swap the pool
+        over to it. Returns True when a new replica is in use.
+        """
+        replica = self.build()
+        if replica is None:
+            return False
+
+        uri, keeper, version = replica
+        previous = self._keeper
+        self.pool.retarget(uri)
+        self._keeper, self.file_version = keeper, version
+        self.version = f"{version}-{sql_execution.stored_version(keeper)}"
+
+        # Connections still reading the previous replica
+        # keep it alive until they are returned
+        if previous is not None:
+            previous.close()
+        logger.info("Swapped in replica of %s at version %s", self.database, self.version)
+        return True
+
+    def start(self):
+        """
+        Build the first replica and start watching the file.
+        """
+        if not self.refresh():
+            raise RuntimeError(f"{self.database} is not a complete database")
+        sql_execution.replica = self
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name='employee-events-replica', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop watching and point the pool back at the file.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if sql_execution.replica is self:
+            sql_execution.replica = None
+        self.pool.retarget(None)
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+    def _watch(self):
+        seen = self.file_version
+        while not self._stop.wait(self.interval):
+            try:
+                current = sql_execution.file_version(self.database)
+            except FileNotFoundError:
+                # The file is being rebuilt
+                seen = None
+                continue
+
+            # Rebuild once the file has stopped changing
+            # for a whole interval
+            if current != self.file_version and current == seen:
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Could not refresh the replica of %s",
+                                     self.database)
+            seen = current
@@ -0,0 +1,179 @@
+"""
+Batched recruitment risk scoring.
+
+Scores every employee with a single vectorized
+`predict_proba` call, averages the per-employee scores
+of each team, and stores both in the `risk_scores` table.
+
+Usage:
+    python -m employee_events.risk_scores path/to/model.pkl [--force]
+"""
+from sqlite3 import connect
+from pathlib import Path
+import argparse
+import hashlib
+import pickle
+
+from .sql_execution import db_path
+
+FEATURES = ['positive_events', 'negative_events']
+
+# The marker returned by `events_version`. Also used by
+# `QueryBase.risk_score` to skip scores computed before
+# the latest events were added.
+EVENTS_VERSION = """
+    SELECT COUNT(*)
+           || '-' || CAST(TOTAL(positive_events) AS INTEGER)
+           || '-' || CAST(TOTAL(negative_events) AS INTEGER)
+    FROM employee_totals
+"""
+
+
+def model_version(model_path):
+    """
+    Returns a short hash of a serialized model file.
+    """
+    digest = hashlib.sha256(Path(model_path).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def events_version(connection):
+    """
+    Returns a marker that changes whenever event rows
+    are added, read from the `employee_totals` rollup.
+    """
+    return connection.execute(EVENTS_VERSION).fetchone()[0]
+
+
+def scores_current(connection, version):
+    """
+    Returns True when the stored scores were computed by
+    `version` of the model from the current event totals.
+    """
+    stored = connection.execute("""
+        SELECT DISTINCT model_version, events_version FROM risk_scores
+    """).fetchall()
+    return stored == [(version, events_version(connection))]
+
+
+def compute_scores(predictor, totals):
+    """
+    Score a dataframe of per-(team, employee) event totals.
+    Returns a dataframe of (entity, entity_id, score) rows
+    for every employee and every team.
+    """
+    import pandas as pd
+
+    # An employee's score uses their totals across all
+    # teams, a team's score is the mean over the employee
+    # rows recorded for that team. Both sets of rows are
+    # scored together in one call.
+    employees = totals.groupby('employee_id')[FEATURES].sum()
+    features = pd.concat([employees[FEATURES], totals[FEATURES]],
+                         ignore_index=True)
+    probabilities = predictor.predict_proba(features)[:, 1]
+
+    employee_scores = probabilities[:len(employees)]
+    team_scores = (
+        pd.Series(probabilities[len(employees):], index=totals['team_id'])
+        .groupby(level=0)
+        .mean()
+    )
+
+    return pd.concat([
+        pd.DataFrame({'entity': 'employee',
+                      'entity_id': employees.index,
+                      'score': employee_scores}),
+        pd.DataFrame({'entity': 'team',
+                      'entity_id': team_scores.index,
+                      'score': team_scores.to_numpy()}),
+    ], ignore_index=True)
+
+
+def score_all(predictor, version, database=db_path, force=False):
+    """
+    Recompute and store the risk score of every employee
+    and team, unless the stored scores were already
+    computed by this model `version` from the current
+    events. Returns True when the scores were rewritten.
+    """
+    connection = connect(database, isolation_level=None)
+    try:
+        if not force and scores_current(connection, version):
+            return False
+
+        import pandas as pd
+
+        marker = events_version(connection)
+        totals = pd.read_sql_query(
+            "SELECT team_id, employee_id, positive_events, negative_events "
+            "FROM employee_totals",
+            connection,
+        )
+        scores = compute_scores(predictor, totals) if len(totals) else None
+
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("DELETE FROM risk_scores")
+        if scores is not None:
+            connection.executemany(
+                "INSERT INTO risk_scores VALUES (?, ?, ?, ?, ?)",
+                (
+                    (entity, int(entity_id), float(score), version, marker)
+                    for entity, entity_id, score
+                    in scores.itertuples(index=False, name=None)
+                ),
+            )
+        connection.execute("COMMIT")
+        return True
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+
+def refresh(model_path, database=db_path, force=False, loader=None):
+    """
+    Rescore the database with the model stored at `model_path`
+    when the model or the events have changed. The model is
+    only deserialized when scoring is actually needed.
+    """
+    version = model_version(model_path)
+    if not force:
+        connection = connect(database)
+        try:
+            if scores_current(connection, version):
+                return False
+        finally:
+            connection.close()
+
+    if loader is None:
+        with Path(model_path).open('rb') as file:
+            predictor = pickle.load(file)
+    else:
+        predictor = loader()
+
+    return score_all(predictor, version, database, force=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute recruitment risk scores.")
+    parser.add_argument('model', type=Path,
+                        help="Path to the pickled model")
+    parser.add_argument('database', nargs='?', default=db_path, type=Path,
+                        help="Path to the sqlite file "
+                             "(defaults to the packaged database)")
+    parser.add_argument('--force', action='store_true',
+                        help="Rescore even if the stored scores are current")
+    args = parser.parse_args(argv)
+
+    if refresh(args.model, args.database, args.force):
+        print(f"Rescored {args.database}")
+    else:
+        print(f"Risk scores in {args.database} are current")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,167 @@
-from sqlite3 import connect
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from functools import wraps
-import pandas as pd
+from functools import partial, wraps
+from sqlite3 import connect, OperationalError
+import asyncio
+import os
+
+from .connection_pool import ConnectionPool
 
 # Using pathlib, create a `db_path` variable
 # that points to the absolute path for the `employee_events.db` file
 db_path = Path(__file__).parent.resolve() / 'employee_events.db'
 
+# Shared pool of read-only connections to `db_path`.
+# Use `pool.resize` and `pool.stats` to tune and
+# monitor it at runtime.
+pool = ConnectionPool(db_path)
+
+# Threads that run the blocking sqlite3 calls behind
+# the async query methods, so awaiting a query never
+# blocks the event loop. Sized to the pool, as any
+# extra thread would only wait for a connection.
+query_executor = ThreadPoolExecutor(
+    max_workers=pool.size, thread_name_prefix='query')
+
+
+# The `replica.Replica` the pool reads while one is running
+replica = None
+
+
+def data_version(database=db_path):
+    """
+    Returns a string that changes whenever the data in
+    the database does: the version of the files, which
+    catches rebuilds and direct writes, followed by the
+    `data_version` marker that every ingestion bumps.
+    While the pool reads an in-memory replica, the version
+    of the file and marker the replica was copied from is
+    returned instead, without touching the disk.
+    """
+    if replica is not None and Path(database) == db_path:
+        return replica.version
+    return f"{file_version(database)}-{ingested_version(database)}"
+
+
+def stored_version(connection):
+    """
+    Returns the `data_version` marker of an open
+    connection, or 0 before migration 6 added it.
+    """
+    try:
+        row = connection.execute(
+            "SELECT version FROM data_version WHERE id = 1").fetchone()
+    except OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+def ingested_version(database=db_path):
+    """
+    Returns the `data_version` marker of a database. The
+    packaged database is read through the shared pool.
+    """
+    if Path(database) == db_path:
+        with pool.connection() as connection:
+            return stored_version(connection)
+
+    connection = connect(f"{Path(database).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return stored_version(connection)
+    finally:
+        connection.close()
+
+
+def file_version(database=db_path):
+    """
+    Returns a string that changes whenever the
+    database file is rewritten. In WAL mode new rows
+    land in the `-wal` file first, so it is included.
+    """
+    stat = os.stat(database)
+    version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    wal = wal_stat(database)
+    if wal is not None:
+        version += f"-{wal.st_mtime_ns:x}-{wal.st_size:x}"
+    return version
+
+
+def wal_stat(database):
+    # Readers recreate an empty `-wal` file after the last
+    # writer removed it, which does not change the data
+    try:
+        stat = os.stat(f"{database}-wal")
+    except FileNotFoundError:
+        return None
+    return stat if stat.st_size else None
+
 
 # OPTION 1: MIXIN
 # Define a class called `QueryMixin`
 class QueryMixin:
-    
+
     # Define a method named `pandas_query`
     # that receives an sql query as a string
+    # and the values bound to its `?` parameters
     # and returns the query's result
     # as a pandas dataframe
-    def pandas_query(self, sql_query):
-        # Use the `connect` method to connect to the database
-        connection = connect(db_path)
-        # Use the `pd.read_sql_query` method to execute the query
+    def pandas_query(self, sql_query, params=()):
+        # pandas is only imported once a dataframe is needed
+        import pandas as pd
+
+        # Borrow a connection from the pool and
+        # use the `pd.read_sql_query` method to execute the query
         # and return the result as a pandas dataframe
-        df = pd.read_sql_query(sql_query, connection)
-        # Close the connection
-        connection.close()
-        return df
+        with pool.connection() as connection:
+            return pd.read_sql_query(sql_query, connection, params=params)
 
     # Define a method named `query`
     # that receives an sql_query as a string
+    # and the values bound to its `?` parameters
     # and returns the query's result as
     # a list of tuples. (You will need
     # to use an sqlite3 cursor)
-    def query(self, sql_query):
-        # Use the `connect` method to connect to the database
-        connection = connect(db_path)
-        # Create a cursor object
-        cursor = connection.cursor()
-        # Execute the query and fetch all results
-        result = cursor.execute(sql_query).fetchall()
-        # Close the connection
-        connection.close()
-        return result
-    
+    def query(self, sql_query, params=()):
+        # Borrow a connection from the pool,
+        # execute the query and fetch all results.
+        # Reusing the same sql text lets sqlite3's
+        # statement cache skip recompiling it.
+        with pool.connection() as connection:
+            return connection.execute(sql_query, params).fetchall()
+
+    # Run a blocking method on `query_executor` and
+    # return an awaitable for its result
+    def run_async(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(query_executor, partial(func, *args))
+
+    # Async counterparts of the methods above
+    async def apandas_query(self, sql_query, params=()):
+        return await self.run_async(self.pandas_query, sql_query, params)
+
+    async def aquery(self, sql_query, params=()):
+        return await self.run_async(self.query, sql_query, params)
+
+    # Returns the current version marker of the database
+    def data_version(self):
+        return data_version()
+
 
- 
- # Leave this code unchanged
 def query(func):
     """
     Decorator that runs a standard sql execution
-    and returns a list of tuples
+    and returns a list of tuples.
+    The decorated function may return either the sql
+    string or a `(sql, params)` tuple.
     """
 
     @wraps(func)
     def run_query(*args, **kwargs):
         query_string = func(*args, **kwargs)
-        connection = connect(db_path)
-        cursor = connection.cursor()
-        result = cursor.execute(query_string).fetchall()
-        connection.close()
-        return result
-    
+        params = ()
+        if isinstance(query_string, tuple):
+            query_string, params = query_string
+        with pool.connection() as connection:
+            return connection.execute(query_string, params).fetchall()
+
     return run_query
@@ -17,6 +17,48 @@ class Team(QueryBase):
     # to the string "team"
     name = "team"
 
+    statements = {
+
+        # Query 5
+        # Select the team_name and team_id
+        # columns for all teams in the database
+        'names': """
+            SELECT team_name,
+                   team_id
+            FROM {name}
+        """,
+
+        # Query 6
+        # Select the team_name of the team
+        # whose id is bound to the `?` parameter
+        'username': """
+            SELECT team_name
+            FROM {name}
+            WHERE team_id = ?
+        """,
+
+        # The first teams, by name, whose lower-cased
+        # name falls in the range bound to the `?` parameters
+        'search': """
+            SELECT team_name,
+                   team_id
+            FROM {name}
+            WHERE lower(team_name) >= ?
+              AND lower(team_name) < ?
+            ORDER BY lower(team_name)
+            LIMIT ?
+        """,
+
+        # This SQL query generates the data needed for
+        # the machine learning model.
+        'model_data': """
+            SELECT positive_events, negative_events
+            FROM employee_totals
+            WHERE team_id = ?
+            ORDER BY employee_id
+        """,
+    }
+
 
     # Define a `names` method
     # that receives no arguments
@@ -27,19 +69,7 @@ class Team(QueryBase):
         Returns a list of tuples containing the names
         and ids of all teams in the database.
         """
-        
-        # Query 5
-        # Write an SQL query that selects
-        # the team_name and team_id columns
-        # from the team table for all teams
-        # in the database
-        sql_query = f"""
-            SELECT team_name, 
-                   team_id
-            FROM {self.name}
-        """
-
-        return self.query(sql_query)
+        return self.query(self.sql['names'])
     
 
     # Define a `username` method
@@ -51,43 +81,19 @@ class Team(QueryBase):
         Returns a list of tuples containing the team name
         and id of a specific team in the database.
         """
+        return self.query(self.sql['username'], (id,))
 
-        # Query 6
-        # Write an SQL query
-        # that selects the team_name column
-        # Use f-string formatting and a WHERE filter
-        # to only return the team name related to
-        # the ID argument
-        sql_query = f"""
-            SELECT team_name
-            FROM {self.name}
-            WHERE team_id = {id}
-        """
-
-        return self.query(sql_query)
 
-
-    # Below is method with an SQL query
-    # This SQL query generates the data needed for
-    # the machine learning model.
-    # Without editing the query, alter this method
-    # so when it is called, a pandas dataframe
-    # is returns containing the execution of
-    # the sql query
-    #### YOUR CODE HERE
+    # Returns a pandas dataframe containing
+    # the data needed for the machine learning model
     def model_data(self, id):
+        if self.event_store is not None:
+            return self.event_store.model_data(self.name, id)
+        return self.pandas_query(self.sql['model_data'], (id,))
+
+    # Async counterparts of `username` and `model_data`
+    async def ausername(self, id):
+        return await self.aquery(self.sql['username'], (id,))
 
-        sql_query = f"""
-            SELECT positive_events, negative_events FROM (
-                    SELECT employee_id,
-                         SUM(positive_events) positive_events,
-                         SUM(negative_events) negative_events
-                    FROM {self.name}
-                    JOIN employee_events
-                        USING({self.name}_id)
-                    WHERE {self.name}.{self.name}_id = {id}
-                    GROUP BY employee_id
-                   )
-                """
-        
-        return self.pandas_query(sql_query)
\ No newline at end of file
+    async def amodel_data(self, id):
+        return await self.run_async(self.model_data, id)
@@ -13,6 +13,13 @@ setup_args = dict(
     packages=find_packages(),
     package_data={'': ['employee_events.db', 'requirements.txt']},
     install_requirements=requirements,
+    entry_points={
+        'console_scripts': [
+            'employee-events-upgrade=employee_events.migrations:main',
+            'employee-events-score=employee_events.risk_scores:main',
+            'employee-events-ingest=employee_events.ingestion:main',
+        ],
+    },
     )
 
 if __name__ == "__main__":
@@ -1,5 +1,9 @@
 from .base_component import BaseComponent
 from .dropdown import Dropdown
+from .typeahead import TypeaheadDropdown
 from .radio import Radio
 from .matplotlib_viz import MatplotlibViz
-from .data_table import DataTable
\ No newline at end of file
+from .data_table import DataTable
+from .component_cache import ComponentCache, component_cache
+from .image_cache import ImageCache, image_cache
+from . import svg_chart
\ No newline at end of file
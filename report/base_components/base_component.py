@@ -1,5 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+from fasthtml.components import Div
+import asyncio
+
+# Shared by every component rendering off the event loop
+# and by combined components rendering their children
+# concurrently
+render_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='render')
+
+
 class BaseComponent:
 
+    # Set to a `ComponentCache` to reuse the rendered
+    # component until the underlying data changes
+    cache = None
+
+    # Deferred components are rendered by combined
+    # components as a placeholder that fetches the
+    # component from `{fragment_url}/{fragment_name}/
+    # {model name}/{entity id}` once the page loads
+    deferred = False
+    fragment_name = None
+    fragment_url = "/fragment"
+
     def build_component(self, entity_id, model):
         raise NotImplementedError
     
@@ -10,8 +32,50 @@ class BaseComponent:
     def component_data(self, entity_id, model):
         raise NotImplemented
 
-    def __call__(self, entity_id, model):
+    def render(self, entity_id, model):
 
         component = self.build_component(entity_id, model)
 
-        return self.outer_div(component)
\ No newline at end of file
+        return self.outer_div(component)
+
+    def __call__(self, entity_id, model):
+
+        if self.cache is None:
+            return self.render(entity_id, model)
+
+        return self.cache.get_or_render(
+            self, entity_id, model,
+            lambda: self.render(entity_id, model)
+        )
+
+    async def arender(self, entity_id, model):
+        # Queries and plotting block, so they
+        # run on `render_executor`
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            render_executor, self.render, entity_id, model)
+
+    async def acall(self, entity_id, model):
+        """
+        Async counterpart of calling the component,
+        for use from async route handlers.
+        """
+        if self.cache is None:
+            return await self.arender(entity_id, model)
+
+        return await self.cache.aget_or_render(
+            self, entity_id, model,
+            lambda: self.arender(entity_id, model)
+        )
+
+    def placeholder(self, entity_id, model):
+        """
+        Empty element that HTMX replaces with
+        the component's fragment on page load.
+        """
+        return Div(
+            hx_get=f"{self.fragment_url}/{self.fragment_name}/{model.name}/{entity_id}",
+            hx_trigger="load",
+            hx_swap="outerHTML",
+            aria_busy="true",
+        )
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class ComponentCache:
+    """
+    Thread-safe LRU cache for rendered components
+    with a time-to-live and a maximum number of entries.
+
+    Entries are keyed by the component, the model name,
+    the entity id and the model's data version. The whole
+    cache is dropped as soon as a different data version
+    is seen, so a rewritten database never serves stale
+    components.
+    """
+
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._stats = dict(hits=0, misses=0, evictions=0, invalidations=0)
+
+    def key(self, component, entity_id, model):
+        return (
+            id(component),
+            type(component).__qualname__,
+            model.name,
+            str(entity_id),
+        )
+
+    def version(self, model):
+        data_version = getattr(model, 'data_version', None)
+        return data_version() if data_version else None
+
+    def get_or_render(self, component, entity_id, model, render):
+        """
+        Return the cached output for this component, model and
+        entity, calling `render()` and storing its result on a miss.
+        """
+        found, output, entry = self._lookup(component, entity_id, model)
+        if found:
+            return output
+
+        output = render()
+        self._store(entry, output)
+        return output
+
+    async def aget_or_render(self, component, entity_id, model, render):
+        """
+        Same as `get_or_render` for an async `render()`.
+        """
+        found, output, entry = self._lookup(component, entity_id, model)
+        if found:
+            return output
+
+        output = await render()
+        self._store(entry, output)
+        return output
+
+    def _lookup(self, component, entity_id, model):
+        # Returns whether the output was cached, the cached
+        # output, and what `_store` needs to cache a new one
+        version = self.version(model)
+        key = self.key(component, entity_id, model)
+        now = time.monotonic()
+
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self._stats['invalidations'] += 1
+                self._entries.clear()
+                self._version = version
+
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return True, entry[1], None
+            self._stats['misses'] += 1
+
+        return False, None, (key, version, now)
+
+    def _store(self, entry, output):
+        key, version, now = entry
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (now + self.ttl, output)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+
+# Cache shared by the components that opt in
+# by setting their `cache` class attribute to it
+component_cache = ComponentCache()
@@ -1,31 +1,82 @@
-from .base_component import BaseComponent
-from fasthtml.common import Table, Tr, Th, Td
+from .base_component import BaseComponent, render_executor
+from fasthtml.components import Table, Tr, Th, Td, Button
+from urllib.parse import urlencode
+import asyncio
 
 
 class DataTable(BaseComponent):
 
+    # Set to a number of rows to render the table one page
+    # at a time. Paged tables implement `page_data` and
+    # fetch further pages from `load_more_url`.
+    page_size = None
+    load_more_url = ""
 
     def build_component(self, entity_id, model):
 
         if model.name:
 
-            data = self.component_data(entity_id, model)
+            if self.page_size is None:
+                data = self.component_data(entity_id, model)
+                return self.table(data)
 
-            table = Table(
-                Tr(
-                    Th(column) for column in data.columns
-                )
+            data, cursor = self.page_data(entity_id, model, None)
+            return Table(
+                self.header_row(data),
+                *self.page_rows(entity_id, model, data, cursor)
             )
 
-            for data_row in data.to_numpy():
+    def table(self, data):
+        return Table(self.header_row(data), *self.rows(data))
 
-                table_row = Tr(
-                    Td(val) for val in data_row
-                )
+    def header_row(self, data):
+        return Tr(*(Th(column) for column in data.columns))
 
-                children = (*table.children, table_row)
-                table.children = children
-            
-            return table
-            
-        
\ No newline at end of file
+    def rows(self, data):
+        # Build every row in one pass so rendering
+        # stays linear in the number of rows
+        return [
+            Tr(*(Td(val) for val in data_row))
+            for data_row in data.itertuples(index=False, name=None)
+        ]
+
+    def page_data(self, entity_id, model, after):
+        """
+        Returns a dataframe of at most `page_size` rows following
+        the `after` cursor, and the cursor of the next page or
+        None when this is the last one.
+        """
+        raise NotImplementedError
+
+    def page(self, entity_id, model, after):
+        """
+        Returns the rows of the page following `after`, for
+        the "load more" button to swap in place of its own row.
+        """
+        data, cursor = self.page_data(entity_id, model, after)
+        return tuple(self.page_rows(entity_id, model, data, cursor))
+
+    async def apage(self, entity_id, model, after):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            render_executor, self.page, entity_id, model, after)
+
+    def page_rows(self, entity_id, model, data, cursor):
+        rows = self.rows(data)
+        if cursor is not None:
+            rows.append(self.load_more_row(entity_id, model, data, cursor))
+        return rows
+
+    def load_more_row(self, entity_id, model, data, cursor):
+        query = urlencode({'after': cursor}, doseq=True)
+        return Tr(
+            Td(
+                Button(
+                    "Load more",
+                    hx_get=f"{self.load_more_url}/{model.name}/{entity_id}?{query}",
+                    hx_target="closest tr",
+                    hx_swap="outerHTML",
+                ),
+                colspan=len(data.columns),
+            )
+        )
@@ -1,5 +1,5 @@
 from .base_component import BaseComponent
-from fasthtml.common import Select, Label, Div, Option
+from fasthtml.components import Select, Label, Div, Option
 
 class Dropdown(BaseComponent):
 
@@ -10,10 +10,7 @@ class Dropdown(BaseComponent):
         self.label = label
 
     def build_component(self, entity_id, model):
-        options = []
-        for text, value in self.component_data(entity_id, model):
-            option = Option(text, value=value, selected="selected" if str(value) == entity_id else "")
-            options.append(option)
+        options = self.options(self.component_data(entity_id, model), entity_id)
 
 
         dropdown_settings = {
@@ -28,13 +25,24 @@ class Dropdown(BaseComponent):
             **dropdown_settings
             )
         
-        return selector
-    
+        # The label is returned with the selector rather than
+        # stored on the instance, which is shared by every request
+        return Label(self.label_text(model), _for=self.id), selector
+
+    def options(self, data, entity_id):
+        options = []
+        for text, value in data:
+            option = Option(text, value=value, selected="selected" if str(value) == entity_id else "")
+            options.append(option)
+        return options
+
+    def label_text(self, model):
+        return self.label
+
     def outer_div(self, child):
 
         return Div(
-            Label(self.label, _for=self.id),
-            child,
+            *child,
             id=self.id,
         )
     
\ No newline at end of file
@@ -0,0 +1,120 @@
+from pathlib import Path
+import os
+import tempfile
+import threading
+
+
+class ImageCache:
+    """
+    On-disk cache of rendered chart images keyed by a
+    content hash, so a chart is rendered once per data
+    version and survives server restarts.
+
+    Files are written to a temporary name and renamed into
+    place, so readers never see a partial image. The oldest
+    files are removed once there are more than `max_files`.
+
+    The directory is created private to the current user, and
+    a directory that other users could write to is refused,
+    as its files are served to browsers as they are.
+    """
+
+    def __init__(self, directory, max_files=2048):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._checked = False
+
+    def check_directory(self):
+        """
+        Create the cache directory with mode 0700, or make
+        sure an existing one belongs to this user and is not
+        open to anyone else. Files others could have planted
+        are never served, so a shared directory is refused
+        rather than tightened.
+        """
+        if self._checked:
+            return
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        stat = self.directory.lstat()
+        if not self.directory.is_dir() or self.directory.is_symlink():
+            raise PermissionError(f"{self.directory} is not a directory")
+        if stat.st_uid != os.getuid():
+            raise PermissionError(f"{self.directory} belongs to another user")
+        if stat.st_mode & 0o077:
+            raise PermissionError(
+                f"{self.directory} is open to other users "
+                f"(mode {stat.st_mode & 0o777:o}), remove it or chmod it to 700")
+        self._checked = True
+
+    def path(self, key):
+        # Keys are generated by the components, but never
+        # let one escape the cache directory
+        return self.directory / Path(key).name
+
+    def get(self, key):
+        self.check_directory()
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        self.check_directory()
+        path = self.path(key)
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 64 == 0
+        if prune:
+            self.prune()
+
+    def get_or_render(self, key, render):
+        """
+        Return the cached bytes for `key`, calling `render()`
+        and storing its result when there are none.
+        """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def prune(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                files.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                continue
+
+        files.sort()
+        for _, path in files[:max(len(files) - self.max_files, 0)]:
+            Path(path).unlink(missing_ok=True)
+
+
+def default_directory():
+    """
+    The directory named by `EMPLOYEE_EVENTS_CHART_CACHE`, or
+    `employee-events/charts` in the user's cache directory.
+    """
+    directory = os.environ.get('EMPLOYEE_EVENTS_CHART_CACHE')
+    if directory:
+        return Path(directory)
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'employee-events' / 'charts'
+
+
+# Cache shared by every chart served by URL
+image_cache = ImageCache(default_directory())
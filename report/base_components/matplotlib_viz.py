@@ -1,56 +1,285 @@
-from .base_component import BaseComponent
+from .base_component import BaseComponent, render_executor
+from .image_cache import image_cache
 
-import matplotlib.pyplot
-from fasthtml.common import Img
-import matplotlib.pylab as plt
-import matplotlib
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+import asyncio
+import hashlib
+import sys
+import threading
+from fasthtml.components import Img, NotStr
 import io
 import base64
 
-# This is necessary to prevent matplotlib from causing memory leaks
-# https://stackoverflow.com/questions/31156578/matplotlib-doesnt-release-memory-after-savefig-and-close
-matplotlib.use('Agg')
-matplotlib.rcParams['savefig.transparent'] = True
-matplotlib.rcParams['savefig.format'] = 'png'
+MEDIA_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+
+# matplotlib is only imported by the first PNG render,
+# so dashboards serving SVG charts never load it
+@cache
+def configure_matplotlib():
+    import matplotlib
+
+    # This is necessary to prevent matplotlib from causing memory leaks
+    # https://stackoverflow.com/questions/31156578/matplotlib-doesnt-release-memory-after-savefig-and-close
+    matplotlib.use('Agg')
+    matplotlib.rcParams['savefig.transparent'] = True
+    matplotlib.rcParams['savefig.format'] = 'png'
+    return matplotlib
+
+
+def pyplot():
+    """
+    Returns `matplotlib.pyplot` configured for
+    off-screen rendering.
+    """
+    configure_matplotlib()
+    import matplotlib.pyplot as plt
+    return plt
+
+
+@cache
+def renderer_version(component_type):
+    """
+    Returns a hash of the code that draws charts of
+    `component_type`: its module, this module, the SVG
+    helpers and the installed matplotlib. It changes with
+    every deploy that could change how a chart looks.
+    """
+    from importlib.metadata import version, PackageNotFoundError
+    from . import svg_chart
+
+    digest = hashlib.sha256()
+    for module in (sys.modules.get(component_type.__module__), sys.modules[__name__], svg_chart):
+        source = getattr(module, '__file__', None)
+        if source:
+            digest.update(Path(source).read_bytes())
+    try:
+        digest.update(version('matplotlib').encode())
+    except PackageNotFoundError:
+        pass
+    return digest.hexdigest()[:16]
+
+
+def figure2png(fig):
+    """
+    Render a figure to PNG bytes.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def figure2fasthtml(fig):
+    """
+    Render a figure to PNG and wrap it in an inline Img.
+    """
+    png = base64.b64encode(figure2png(fig)).decode()
+    return Img(src=f'data:image/png;base64,{png}')
 
 
 def matplotlib2fasthtml(func):
     '''
-    Copy of https://github.com/koaning/fh-matplotlib, which is currently hardcoding the 
+    Copy of https://github.com/koaning/fh-matplotlib, which is currently hardcoding the
     image format as jpg. png or svg is needed here.
     '''
     def wrapper(*args, **kwargs):
-        # Reset the figure to prevent accumulation. Maybe we need a setting for this?
-        fig = plt.figure()
+        plt = pyplot()
 
-        # Run function as normal
+        # Run function as normal. It creates
+        # and draws on the current pyplot figure
         func(*args, **kwargs)
+        fig = plt.gcf()
 
         # Store it as base64 and put it into an image.
-        my_stringIObytes = io.BytesIO()
-        plt.savefig(my_stringIObytes)
-        my_stringIObytes.seek(0)
-        my_base64_jpgData = base64.b64encode(my_stringIObytes.read()).decode()
+        img = figure2fasthtml(fig)
 
-        # Close the figure to prevent memory leaks
+        # Close only this figure, so concurrent renders
+        # keep theirs, and to prevent memory leaks
         plt.close(fig)
-        plt.close('all')
-        return Img(src=f'data:image/jpg;base64, {my_base64_jpgData}')
+        return img
     return wrapper
 
 
+class FigurePool:
+    """
+    Pool of pre-built Figure/Axes pairs rendered through
+    `FigureCanvasAgg` instead of pyplot's global state.
+
+    Each pair is checked out by one render at a time, so
+    charts can be drawn from several threads at once, and
+    the artists left on an axes by the previous render can
+    be updated in place instead of recreated.
+    """
+
+    def __init__(self, size=4, figsize=(6.4, 4.8), dpi=100):
+        self.size = size
+        self.figsize = figsize
+        self.dpi = dpi
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _create(self):
+        configure_matplotlib()
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        return fig, ax
+
+    @contextmanager
+    def axes(self):
+        """
+        Check out a `(figure, axes)` pair, creating one when
+        every pooled pair is busy. Pairs beyond `size` are
+        dropped when they are returned.
+        """
+        with self._lock:
+            pair = self._idle.pop() if self._idle else None
+        if pair is None:
+            pair = self._create()
+
+        try:
+            yield pair
+        except Exception:
+            # Artists may be half updated, so do not reuse them
+            pair = None
+            raise
+        finally:
+            if pair is not None:
+                with self._lock:
+                    if len(self._idle) < self.size:
+                        self._idle.append(pair)
+
+
 class MatplotlibViz(BaseComponent):
 
-    @matplotlib2fasthtml
+    # 'png' renders with matplotlib and 'svg' passes
+    # `chart_data` to `svg` and emits the vector markup
+    # directly. Components that do not implement `svg`
+    # always fall back to 'png'.
+    backend = 'png'
+
+    # Number of reusable figures kept per component
+    figure_pool_size = 4
+
+    # Set to the path of the chart route to emit an
+    # `<img src>` pointing at `image_src` instead of
+    # inlining the chart. The route serves `aimage`.
+    image_url = None
+    image_cache = image_cache
+
     def build_component(self, entity_id, model):
+        if self.image_url:
+            return Img(src=self.image_src(entity_id, model),
+                       alt=self.fragment_name or type(self).__name__)
+        if self.image_format == 'svg':
+            return self.svg_component(entity_id, model)
+        return self.png_component(entity_id, model)
+
+    @property
+    def image_format(self):
+        if self.backend == 'svg' and type(self).svg is not MatplotlibViz.svg:
+            return 'svg'
+        return 'png'
+
+    def image_key(self, entity_id, model):
+        """
+        File name of the chart image, a hash of the chart,
+        the code that renders it, the model, the entity and
+        the data version, so its content never changes.
+        """
+        identity = '|'.join(str(part) for part in (
+            type(self).__qualname__, renderer_version(type(self)),
+            self.fragment_name, self.image_format,
+            model.name, entity_id, model.data_version(),
+        ))
+        digest = hashlib.sha256(identity.encode()).hexdigest()[:24]
+        return f"{digest}.{self.image_format}"
+
+    def image_src(self, entity_id, model):
+        return (f"{self.image_url}/{self.fragment_name}/{model.name}/"
+                f"{entity_id}/{self.image_key(entity_id, model)}")
+
+    def image(self, entity_id, model, key=None):
+        """
+        Returns the chart image as bytes, rendering
+        it only if it is not in `image_cache`.
+        """
+        key = key or self.image_key(entity_id, model)
+        return self.image_cache.get_or_render(
+            key, lambda: self.image_bytes(entity_id, model))
+
+    async def aimage(self, entity_id, model, key=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            render_executor, self.image, entity_id, model, key)
+
+    def image_bytes(self, entity_id, model):
+        if self.image_format == 'svg':
+            return self.svg(self.chart_data(entity_id, model)).encode()
+
+        if type(self).draw is MatplotlibViz.draw:
+            plt = pyplot()
+            self.visualization(entity_id, model)
+            fig = plt.gcf()
+            try:
+                return figure2png(fig)
+            finally:
+                plt.close(fig)
+
+        data = self.chart_data(entity_id, model)
+        with self.figure_pool.axes() as (fig, ax):
+            self.draw(ax, data)
+            return figure2png(fig)
+
+    def png_component(self, entity_id, model):
+        # Components that implement `draw` render on pooled
+        # figures; others use the pyplot `visualization`
+        if type(self).draw is MatplotlibViz.draw:
+            return self.pyplot_component(entity_id, model)
+
+        data = self.chart_data(entity_id, model)
+        with self.figure_pool.axes() as (fig, ax):
+            self.draw(ax, data)
+            return figure2fasthtml(fig)
+
+    @matplotlib2fasthtml
+    def pyplot_component(self, entity_id, model):
         return self.visualization(entity_id, model)
-    
-    
+
+    def svg_component(self, entity_id, model):
+        data = self.chart_data(entity_id, model)
+        return NotStr(self.svg(data))
+
+    @property
+    def figure_pool(self):
+        pool = self.__dict__.get('_figure_pool')
+        if pool is None:
+            pool = self.__dict__.setdefault(
+                '_figure_pool', FigurePool(self.figure_pool_size))
+        return pool
+
+    def chart_data(self, entity_id, model):
+        raise NotImplementedError
+
     def visualization(self, entity_id, model):
         pass
 
+    def draw(self, ax, data):
+        raise NotImplementedError
+
+    def svg(self, data):
+        raise NotImplementedError
+
     def set_axis_styling(self, ax, bordercolor='white', fontcolor='white'):
-        
+
         ax.title.set_color(fontcolor)
         ax.xaxis.label.set_color(fontcolor)
         ax.yaxis.label.set_color(fontcolor)
@@ -1,5 +1,5 @@
 from .base_component import BaseComponent
-from fasthtml.common import Input, Label, Div
+from fasthtml.components import Input, Label, Div
 
 class Radio(BaseComponent):
 
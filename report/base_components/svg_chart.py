@@ -0,0 +1,143 @@
+from html import escape
+import math
+import numpy as np
+
+# Matplotlib's default color cycle, so the vector
+# charts look like the PNG ones they replace
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+
+WIDTH, HEIGHT = 640, 480
+MARGIN = dict(left=80, right=30, top=60, bottom=70)
+
+
+def nice_ticks(low, high, count=5):
+    """
+    Returns evenly spaced tick values covering `low` to `high`
+    with a step of 1, 2 or 5 times a power of ten.
+    """
+    if high <= low:
+        high = low + 1
+    raw_step = (high - low) / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(
+        m * magnitude for m in (1, 2, 5, 10)
+        if m * magnitude >= raw_step
+    )
+    start = math.floor(low / step) * step
+    stop = math.ceil(high / step) * step
+    return np.arange(start, stop + step / 2, step)
+
+
+def _text(x, y, text, size=12, anchor='middle', color='black', **attrs):
+    extra = ''.join(f' {k.replace("_", "-")}="{v}"' for k, v in attrs.items())
+    return (
+        f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" '
+        f'text-anchor="{anchor}" fill="{color}"{extra}>{escape(str(text))}</text>'
+    )
+
+
+def _frame(title, xlabel, ylabel, color):
+    width, height = WIDTH, HEIGHT
+    left, top = MARGIN['left'], MARGIN['top']
+    right, bottom = width - MARGIN['right'], height - MARGIN['bottom']
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="100%" font-family="sans-serif">',
+        f'<rect x="{left}" y="{top}" width="{right - left}" '
+        f'height="{bottom - top}" fill="none" stroke="{color}"/>',
+        _text(width / 2, top / 2 + 10, title, size=20, color=color),
+    ]
+    if xlabel:
+        parts.append(_text((left + right) / 2, height - 15, xlabel,
+                           size=14, color=color))
+    if ylabel:
+        parts.append(_text(20, (top + bottom) / 2, ylabel, size=14, color=color,
+                           transform=f"rotate(-90 20 {(top + bottom) / 2:.1f})"))
+    return parts, (left, top, right, bottom)
+
+
+def _scale(values, low, high, start, stop):
+    span = (high - low) or 1
+    return start + (np.asarray(values, dtype=float) - low) / span * (stop - start)
+
+
+def line_chart(frame, title='', xlabel='', ylabel='',
+               color='black', linewidth=4, dasharray='12,6,3,6'):
+    """
+    Render every column of a dataframe indexed by
+    date strings as a line in an SVG document.
+    """
+    parts, (left, top, right, bottom) = _frame(title, xlabel, ylabel, color)
+
+    dates = np.asarray(frame.index, dtype='datetime64[D]')
+    x_values = dates.astype('int64')
+    values = frame.to_numpy(dtype=float)
+
+    if len(x_values):
+        x_low, x_high = x_values.min(), x_values.max()
+        y_ticks = nice_ticks(min(0, np.nanmin(values)), np.nanmax(values))
+    else:
+        x_low, x_high = 0, 1
+        y_ticks = nice_ticks(0, 1)
+    y_low, y_high = y_ticks[0], y_ticks[-1]
+
+    for tick in y_ticks:
+        y = _scale(tick, y_low, y_high, bottom, top)
+        parts.append(f'<line x1="{left - 5}" y1="{y:.1f}" x2="{left}" '
+                     f'y2="{y:.1f}" stroke="{color}"/>')
+        parts.append(_text(left - 8, y + 4, f'{tick:g}', anchor='end', color=color))
+
+    if len(x_values):
+        tick_dates = np.unique(np.linspace(x_low, x_high, 5).astype('int64'))
+        for tick in tick_dates:
+            x = _scale(tick, x_low, x_high, left, right)
+            label = str(np.datetime64(int(tick), 'D'))[:7]
+            parts.append(f'<line x1="{x:.1f}" y1="{bottom}" x2="{x:.1f}" '
+                         f'y2="{bottom + 5}" stroke="{color}"/>')
+            parts.append(_text(x, bottom + 20, label, color=color))
+
+    xs = _scale(x_values, x_low, x_high, left, right)
+    for position, column in enumerate(frame.columns):
+        ys = _scale(values[:, position], y_low, y_high, bottom, top)
+        points = ' '.join(f'{x:.1f},{y:.1f}' for x, y in zip(xs, ys))
+        line_color = COLORS[position % len(COLORS)]
+        parts.append(
+            f'<polyline points="{points}" fill="none" stroke="{line_color}" '
+            f'stroke-width="{linewidth}" stroke-dasharray="{dasharray}"/>'
+        )
+        legend_y = top + 20 + position * 20
+        parts.append(f'<line x1="{left + 10}" y1="{legend_y}" x2="{left + 40}" '
+                     f'y2="{legend_y}" stroke="{line_color}" stroke-width="{linewidth}"/>')
+        parts.append(_text(left + 48, legend_y + 4, column, anchor='start', color=color))
+
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def barh_chart(values, labels=('',), xlim=(0, 1), title='', color='black'):
+    """
+    Render horizontal bars, one per label, in an SVG document.
+    """
+    parts, (left, top, right, bottom) = _frame(title, '', '', color)
+
+    x_ticks = nice_ticks(*xlim)
+    for tick in x_ticks:
+        x = _scale(tick, xlim[0], xlim[1], left, right)
+        parts.append(f'<line x1="{x:.1f}" y1="{bottom}" x2="{x:.1f}" '
+                     f'y2="{bottom + 5}" stroke="{color}"/>')
+        parts.append(_text(x, bottom + 20, f'{tick:g}', color=color))
+
+    band = (bottom - top) / max(len(values), 1)
+    for position, (value, label) in enumerate(zip(values, labels)):
+        x = _scale(min(max(value, xlim[0]), xlim[1]), xlim[0], xlim[1], left, right)
+        y = top + band * (position + 0.1)
+        parts.append(
+            f'<rect x="{left}" y="{y:.1f}" width="{x - left:.1f}" '
+            f'height="{band * 0.8:.1f}" fill="{COLORS[0]}"/>'
+        )
+        if label:
+            parts.append(_text(left - 8, y + band * 0.4, label,
+                               anchor='end', color=color))
+
+    parts.append('</svg>')
+    return ''.join(parts)
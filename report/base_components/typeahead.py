@@ -0,0 +1,49 @@
+from .dropdown import Dropdown
+from fasthtml.components import Input
+
+
+class TypeaheadDropdown(Dropdown):
+    """
+    Dropdown that lists only the first `limit` names and
+    a search box that replaces them with the names
+    matching what is typed, fetched from
+    `{search_url}/{model name}?q=...`.
+    """
+
+    def __init__(self, id="selector", name="entity-selection", label="",
+                 search_url="/search", limit=10):
+        super().__init__(id, name, label)
+        self.search_url = search_url
+        self.limit = limit
+
+    @property
+    def options_id(self):
+        return f"{self.id}-options"
+
+    def build_component(self, entity_id, model):
+        label, selector = super().build_component(entity_id, model)
+        selector.attrs['id'] = self.options_id
+
+        search = Input(
+            type="search",
+            name="q",
+            placeholder=f"Search {model.name}s",
+            autocomplete="off",
+            hx_get=f"{self.search_url}/{model.name}",
+            hx_trigger="input changed delay:250ms, search",
+            hx_target=f"#{self.options_id}",
+        )
+
+        return label, search, selector
+
+    def component_data(self, entity_id, model):
+        data = model.search("", self.limit)
+
+        # Keep the selected entity listed even when
+        # it is not one of the first names
+        if entity_id is not None and all(str(value) != str(entity_id) for _, value in data):
+            rows = model.username(entity_id)
+            if rows:
+                data = [(rows[0][0], entity_id), *data]
+
+        return data
@@ -1,38 +1,201 @@
-from fastcore.xml import FT
-from fasthtml.common import Div
+import asyncio
+import concurrent.futures
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastcore.xml import FT, to_xml
+from fasthtml.components import Div, NotStr
+from base_components.base_component import render_executor
+
+logger = logging.getLogger(__name__)
+
+# Stands in for the children when `outer_div` is
+# serialized around them by `astream`
+CHILDREN_MARKER = '<!-- children -->'
+
+# Raised when a child runs out of time. Before Python
+# 3.11 neither is the builtin `TimeoutError`.
+TIMEOUT_ERRORS = (TimeoutError, concurrent.futures.TimeoutError, asyncio.TimeoutError)
+
 
 class CombinedComponent:
 
     outer_div_type = Div(cls='container')
-    
-    def __call__(self, userid, model):
-       
+
+    # Set to a `ComponentCache` to reuse the rendered
+    # component until the underlying data changes
+    cache = None
+
+    # Render the children on `render_executor` instead of
+    # one after another. Each child gets `child_timeout`
+    # seconds from when it starts rendering before it is
+    # replaced by `child_error`.
+    concurrent = False
+    child_timeout = 10
+
+    def render(self, userid, model):
+
        called_children = self.call_children(userid, model)
        div_args = self.div_args(userid, model)
 
        return self.outer_div(called_children, div_args)
-    
+
+    def __call__(self, userid, model):
+
+        if self.cache is None:
+            return self.render(userid, model)
+
+        return self.cache.get_or_render(
+            self, userid, model,
+            lambda: self.render(userid, model)
+        )
+
+    async def arender(self, userid, model):
+
+        called_children = await self.acall_children(userid, model)
+        div_args = self.div_args(userid, model)
+
+        return self.outer_div(called_children, div_args)
+
+    async def acall(self, userid, model):
+        """
+        Async counterpart of calling the component. Every child
+        is awaited at the same time, each within `child_timeout`.
+        """
+        if self.cache is None:
+            return await self.arender(userid, model)
+
+        return await self.cache.aget_or_render(
+            self, userid, model,
+            lambda: self.arender(userid, model)
+        )
+
+    async def acall_child(self, child, userid, model):
+        try:
+            if isinstance(child, FT):
+                return child()
+            if getattr(child, 'deferred', False):
+                return child.placeholder(userid, model)
+            if hasattr(child, 'acall'):
+                return await asyncio.wait_for(
+                    child.acall(userid, model), self.child_timeout)
+            return await asyncio.wait_for(
+                asyncio.to_thread(child, userid, model), self.child_timeout)
+        except Exception as error:
+            return self.child_error(child, error)
+
+    async def acall_children(self, userid, model):
+        return list(await asyncio.gather(
+            *(self.acall_child(child, userid, model) for child in self.children)
+        ))
+
+    async def astream(self, userid, model):
+        """
+        Yields the component as serialized HTML. Every child
+        starts rendering at once, and each is yielded as soon as
+        it and the children declared before it are ready.
+        """
+        opening, closing = self.outer_tags(userid, model)
+        tasks = [
+            asyncio.ensure_future(self.acall_child(child, userid, model))
+            for child in self.children
+        ]
+        try:
+            yield opening
+            for task in tasks:
+                yield to_xml(await task)
+            yield closing
+        finally:
+            # The client may disconnect before every child is sent
+            for task in tasks:
+                task.cancel()
+
+    def outer_tags(self, userid, model):
+        # The markup `outer_div` places before and after the children
+        html = to_xml(self.outer_div([NotStr(CHILDREN_MARKER)],
+                                     self.div_args(userid, model)))
+        opening, closing = html.split(CHILDREN_MARKER)
+        return opening, closing
+
+    def call_child(self, child, userid, model):
+        if isinstance(child, FT):
+            return child()
+        if getattr(child, 'deferred', False):
+            return child.placeholder(userid, model)
+        return child(userid, model)
+
     def call_children(self, userid, model):
 
+        if not self.concurrent or len(self.children) < 2:
+            return [self.call_child(child, userid, model)
+                    for child in self.children]
+
+        # The time each child started rendering,
+        # which its deadline is counted from
+        started = {}
+
+        def timed_call_child(index, child):
+            started[index] = time.monotonic()
+            return self.call_child(child, userid, model)
+
+        futures = [
+            render_executor.submit(timed_call_child, index, child)
+            for index, child in enumerate(self.children)
+        ]
+
+        # Collect the results in declared order
         called = []
-        for child in self.children:
-            if isinstance(child, FT):
-                called.append(child())
-                
-            else:
-                called.append(child(userid, model))
-        
+        for index, (child, future) in enumerate(zip(self.children, futures)):
+            # Children that have not got a worker from
+            # `render_executor` by now get a thread of their
+            # own, so nested combined components cannot
+            # deadlock the pool
+            if future.cancel():
+                future = self.submit_alone(timed_call_child, index, child)
+            try:
+                # A worker may have picked the child up
+                # without recording its start time yet
+                deadline = started.get(index, time.monotonic()) + self.child_timeout
+                called.append(
+                    future.result(timeout=max(deadline - time.monotonic(), 0)))
+            except Exception as error:
+                called.append(self.child_error(child, error))
+
         return called
-    
+
+    @staticmethod
+    def submit_alone(func, *args):
+        """
+        Run `func(*args)` on a new thread.
+        Returns its future.
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render-child')
+        try:
+            return executor.submit(func, *args)
+        finally:
+            # The thread exits once `func` returns
+            executor.shutdown(wait=False)
+
+    def child_error(self, child, error):
+        """
+        Placeholder rendered in place of a child
+        that raised or did not finish in time.
+        """
+        logger.error("Rendering %s failed: %r", type(child).__name__, error,
+                     exc_info=not isinstance(error, TIMEOUT_ERRORS))
+        return Div(f"{type(child).__name__} is unavailable", cls='component-error')
+
     def div_args(self, userid, model):
         return {}
-    
+
     def outer_div(self, children, div_args):
 
-        self.outer_div_type.children = ()
+        # Build a new element from the class template rather
+        # than resetting and filling the shared instance,
+        # which concurrent renders would overwrite
+        template = self.outer_div_type
 
-        return self.outer_div_type(
+        return FT(template.tag, (), dict(template.attrs), void_=template.void_)(
             *children,
             **div_args
         )
-    
\ No newline at end of file
@@ -1,5 +1,6 @@
 from .combined_component import CombinedComponent
-from fasthtml.common import Button, Form, Group
+from fasthtml.components import Button, Form
+from fasthtml.pico import Group
 
 class FormGroup(CombinedComponent):
 
@@ -9,15 +10,9 @@ class FormGroup(CombinedComponent):
     children = []
     button_label = "Submit"
 
-    def call_children(self, userid, model):
-        children = super().call_children(userid, model)
-        children.append(Button(self.button_label))
-
-        return children
-
     def outer_div(self, children, div_args):
 
-        return Form(Group(*children), **div_args)
+        return Form(Group(*children, Button(self.button_label)), **div_args)
     
     def div_args(self, userid, model):
 
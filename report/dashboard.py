@@ -1,11 +1,26 @@
-from fasthtml.common import *
-import matplotlib.pyplot as plt
+from functools import cached_property
+from pathlib import Path
+from fasthtml.core import FastHTML, Html, serve, flat_xt, fh_cfg
+from fasthtml.components import H1, Div, Head, Body, Title, NotStr, to_xml
+from starlette.middleware import Middleware
+from starlette.responses import RedirectResponse, Response, StreamingResponse
 
 # Import QueryBase, Employee, Team from employee_events
-from employee_events import Employee, Team
+import employee_events
+from employee_events import (
+    QueryBase, Employee, Team, EventStore, Replica, data_version
+)
 
 # import the load_model function from the utils.py file
-from utils import load_model
+from utils import load_model, refresh_risk_scores
+from http_caching import (
+    ConditionalGetMiddleware, CompressionMiddleware, etag_matches, source_version
+)
+
+# Answer the event count and model data queries from
+# NumPy arrays loaded once per version of the database.
+# Remove this line to run them against SQLite instead.
+QueryBase.event_store = EventStore()
 
 """
 Below, we import the parent classes
@@ -13,18 +28,23 @@ you will use for subclassing
 """
 from base_components import (
     Dropdown,
+    TypeaheadDropdown,
     BaseComponent,
     Radio,
     MatplotlibViz,
-    DataTable
+    DataTable,
+    component_cache,
+    svg_chart
 )
+from base_components.matplotlib_viz import pyplot, MEDIA_TYPES
 
 from combined_components import FormGroup, CombinedComponent
 
 
 # Create a subclass of base_components/dropdown
-# called `ReportDropdown`
-class ReportDropdown(Dropdown):
+# called `ReportDropdown`. It lists the first names
+# and searches the rest as the user types
+class ReportDropdown(TypeaheadDropdown):
     """
     Class for creating a dropdown component
     for selecting a user type.
@@ -33,6 +53,9 @@ class ReportDropdown(Dropdown):
     the selected user type.
     """
 
+    # Reuse the rendered dropdown until the data changes
+    cache = component_cache
+
     # Overwrite the build_component method
     # ensuring it has the same parameters
     # as the Report parent class's method
@@ -43,14 +66,21 @@ class ReportDropdown(Dropdown):
             model: The model to use for retrieving user type data.
             **kwargs: Additional keyword arguments.
         """
-        #  Set the `label` attribute so it is set
-        #  to the `name` attribute for the model
-        self.label = model.name
-
         # Return the output from the
         # parent class's build_component method
         return super().build_component(entity_id, model)
 
+    def label_text(self, model):
+        """
+        Label the dropdown with the model's name.
+        Args:
+            model: The model to use for retrieving user type data.
+        """
+        #  Return the `name` attribute for the model rather
+        #  than setting `self.label`, as the instance is
+        #  shared by concurrent requests
+        return model.name
+
     # Overwrite the `component_data` method
     # Ensure the method uses the same parameters
     # as the parent class method
@@ -63,9 +93,9 @@ class ReportDropdown(Dropdown):
         """
         # Using the model argument
         # call the employee_events method
-        # that returns the user-type's
-        # names and ids
-        return model.names()
+        # that returns the first names and ids
+        # of the user-type, plus the selected one
+        return super().component_data(entity_id, model)
 
 # Create a subclass of base_components/BaseComponent
 # called `Header`
@@ -108,22 +138,34 @@ class LineChart(MatplotlibViz):
     the event counts data.
     """
 
-    # Overwrite the parent class's `visualization`
-    # method. Use the same parameters as the parent
-    def visualization(self, asset_id, model):
+    # Reuse the rendered chart until the data changes
+    cache = component_cache
+
+    # Emit the chart as inline SVG instead of a PNG
+    backend = 'svg'
+
+    # Load the chart from `/fragment/line_chart/...`
+    # after the page. Set `deferred` to False to
+    # render it inline instead
+    deferred = True
+    fragment_name = 'line_chart'
+
+    # Serve the chart from the `/chart` route so
+    # browsers can cache it
+    image_url = '/chart'
+
+    def chart_data(self, asset_id, model):
         """
-        Create a line chart visualization
-        for the report.
+        Get the cumulative event counts for the chart.
         Args:
             model: The model to use for retrieving event counts data.
             asset_id: The ID of the asset to visualize.
-            **kwargs: Additional keyword arguments.
         """
 
         # Pass the `asset_id` argument to
-        # the model's `event_counts` method to
-        # receive the x (Day) and y (event count)
-        df = model.event_counts(asset_id)
+        # the model's `cumulative_event_counts` method to
+        # receive the x (Day) and y (cumulative event count)
+        df = model.cumulative_event_counts(asset_id)
 
         # Use the pandas .fillna method to fill nulls with 0
         df.fillna(0, inplace=True)
@@ -132,25 +174,59 @@ class LineChart(MatplotlibViz):
         # the date column as the index
         df.set_index('event_date', inplace=True)
 
-        # Sort the index
-        df.sort_index(inplace=True)
-
-        # Use the .cumsum method to change the data
-        # in the dataframe to cumulative counts
-        df = df.cumsum()
-
         # Set the dataframe columns to the list
         # ['Positive', 'Negative']
         df.columns = ['Positive', 'Negative']
 
+        return df
+
+    # Overwrite the parent class's `visualization`
+    # method. Use the same parameters as the parent
+    def visualization(self, asset_id, model):
+        """
+        Create a line chart visualization
+        for the report.
+        Args:
+            model: The model to use for retrieving event counts data.
+            asset_id: The ID of the asset to visualize.
+            **kwargs: Additional keyword arguments.
+        """
+
+        df = self.chart_data(asset_id, model)
+
         # Initialize a pandas subplot
         # and assign the figure and axis
         # to variables
-        fig, ax = plt.subplots()
+        fig, ax = pyplot().subplots()
+
+        self.draw(ax, df)
+
+    def draw(self, ax, df):
+        """
+        Draw the cumulative counts on an axis.
+        A pooled axis that already holds this chart
+        has its lines updated in place.
+        Args:
+            ax: The matplotlib axis to draw on.
+            df: The output of `chart_data`.
+        """
+        dates = df.index.to_numpy(dtype='datetime64[D]')
+        lines = ax.get_lines()
+
+        if len(lines) == len(df.columns):
+            for line, column in zip(lines, df.columns):
+                line.set_data(dates, df[column].to_numpy())
+            ax.relim()
+            ax.autoscale_view()
+            return
 
-        # call the .plot method for the
+        ax.clear()
+
+        # Plot one line per column of the
         # cumulative counts dataframe
-        df.plot(ax=ax)
+        for column in df.columns:
+            ax.plot(dates, df[column].to_numpy(), label=column)
+        ax.legend()
 
         # pass the axis variable
         # to the `.set_axis_styling`
@@ -166,6 +242,17 @@ class LineChart(MatplotlibViz):
         ax.set_xlabel('Date', fontsize=14)
         ax.set_ylabel('Event Count', fontsize=14)
 
+    def svg(self, df):
+        """
+        Render the cumulative event counts as an SVG line chart.
+        """
+        return svg_chart.line_chart(
+            df,
+            title='Cumulative Event Counts',
+            xlabel='Date',
+            ylabel='Event Count',
+        )
+
 
 # Create a subclass of base_components/MatplotlibViz
 # called `BarChart`
@@ -178,27 +265,44 @@ class BarChart(MatplotlibViz):
     the recruitment risk data.
     """
 
-    # Create a `predictor` class attribute
-    # assign the attribute to the output
-    # of the `load_model` utils function
-    predictor = load_model()
+    # Reuse the rendered chart until the data changes
+    cache = component_cache
 
-    # Overwrite the parent class `visualization` method
-    # Use the same parameters as the parent
-    def visualization(self, asset_id, model):
+    # Emit the chart as inline SVG instead of a PNG
+    backend = 'svg'
+
+    # Load the chart from `/fragment/bar_chart/...`
+    # after the page
+    deferred = True
+    fragment_name = 'bar_chart'
+
+    # Serve the chart from the `/chart` route so
+    # browsers can cache it
+    image_url = '/chart'
+
+    # Create a `predictor` attribute
+    # assigned to the output of the `load_model`
+    # utils function the first time it is needed
+    @cached_property
+    def predictor(self):
+        return load_model()
+
+    def chart_data(self, asset_id, model):
         """
-        Create a bar chart visualization
-        for the report.
+        Get the predicted recruitment risk for the chart.
         Args:
             model: The model to use for retrieving recruitment risk data.
             asset_id: The ID of the asset to visualize.
-            **kwargs: Additional keyword arguments.
         """
 
-        # Using the model and asset_id arguments
-        # pass the `asset_id` to the `.model_data` method
-        # to receive the data that can be passed to the machine
-        # learning model
+        # Read the score precomputed for every
+        # employee and team by `refresh_risk_scores`
+        score = model.risk_score(asset_id)
+        if score is not None:
+            return score
+
+        # Score inline if this entity has not been scored
+        # yet, or events were ingested since it was
         data = model.model_data(asset_id)
 
         # Using the predictor class attribute
@@ -209,22 +313,48 @@ class BarChart(MatplotlibViz):
         # The shape should be (<number of records>, 1)
         prob = prob[:, 1]
 
-        # Below, create a `pred` variable set to
-        # the number we want to visualize
-        #
         # If the model's name attribute is "team"
         # We want to visualize the mean of the predict_proba output
         if model.name == 'team':
-            # Set `pred` to the mean of the predict_proba output
-            pred = prob.mean()
-        # Otherwise set `pred` to the first value
+            return prob.mean()
+
+        # Otherwise visualize the first value
         # of the predict_proba output
-        else:
-            # Set `pred` to the first value of the predict_proba output
-            pred = prob[0]
+        return prob[0]
+
+    # Overwrite the parent class `visualization` method
+    # Use the same parameters as the parent
+    def visualization(self, asset_id, model):
+        """
+        Create a bar chart visualization
+        for the report.
+        Args:
+            model: The model to use for retrieving recruitment risk data.
+            asset_id: The ID of the asset to visualize.
+            **kwargs: Additional keyword arguments.
+        """
+
+        pred = self.chart_data(asset_id, model)
 
         # Initialize a matplotlib subplot
-        fig, ax = plt.subplots()
+        fig, ax = pyplot().subplots()
+
+        self.draw(ax, pred)
+
+    def draw(self, ax, pred):
+        """
+        Draw the recruitment risk on an axis.
+        A pooled axis that already holds this chart
+        has its bar resized in place.
+        Args:
+            ax: The matplotlib axis to draw on.
+            pred: The output of `chart_data`.
+        """
+        if len(ax.patches) == 1:
+            ax.patches[0].set_width(pred)
+            return
+
+        ax.clear()
 
         # Run the following code unchanged
         ax.barh([''], [pred])
@@ -236,6 +366,16 @@ class BarChart(MatplotlibViz):
         # method
         self.set_axis_styling(ax, bordercolor='black', fontcolor='black')
 
+    def svg(self, pred):
+        """
+        Render the recruitment risk as an SVG bar chart.
+        """
+        return svg_chart.barh_chart(
+            [pred],
+            xlim=(0, 1),
+            title='Predicted Recruitment Risk',
+        )
+
 
 # Create a subclass of combined_components/CombinedComponent
 # called Visualizations
@@ -260,6 +400,9 @@ class Visualizations(CombinedComponent):
     # Leave this line unchanged
     outer_div_type = Div(cls='grid')
 
+    # Render both charts at the same time
+    concurrent = True
+
 # Create a subclass of base_components/DataTable
 # called `NotesTable`
 
@@ -273,6 +416,19 @@ class NotesTable(DataTable):
     the notes data.
     """
 
+    # Reuse the rendered table until the data changes
+    cache = component_cache
+
+    # Render the first 25 notes and let the
+    # `/notes` route serve the rest on request
+    page_size = 25
+    load_more_url = "/notes"
+
+    # Load the table from `/fragment/notes_table/...`
+    # after the page
+    deferred = True
+    fragment_name = 'notes_table'
+
     # Overwrite the `component_data` method
     # using the same parameters as the parent class
     def component_data(self, entity_id, model):
@@ -289,6 +445,16 @@ class NotesTable(DataTable):
         # method. Return the output
         return model.notes(entity_id)
 
+    def page_data(self, entity_id, model, after):
+        """
+        Get one page of notes for the notes table component.
+        Args:
+            model: The model to use for retrieving notes data.
+            entity_id: The ID of the entity to retrieve notes for.
+            after: The cursor returned with the previous page.
+        """
+        return model.notes_page(entity_id, after, self.page_size)
+
 
 class DashboardFilters(FormGroup):
 
@@ -333,29 +499,105 @@ class Report(CombinedComponent):
         NotesTable()
     ]
 
+    # Render the children at the same time
+    # and assemble them in the order above
+    concurrent = True
+
+
+# Serve the queries from an in-memory copy of the
+# database, swapped for a new copy whenever the file
+# is rebuilt
+replica = Replica(interval=2.0)
 
 # Initialize a fasthtml app
-app = FastHTML()
+# When the server starts, score every employee and team
+# unless the stored scores are already current, then
+# copy the database into memory.
+# Pages are compressed, and pages whose data and code
+# have not changed since the browser last fetched them
+# are answered with a 304 before any query runs. The
+# code is hashed from the files, so every worker and
+# restart of the same deploy agree on the ETags.
+app = FastHTML(
+    on_startup=[refresh_risk_scores, replica.start],
+    on_shutdown=[replica.stop],
+    middleware=[
+        Middleware(CompressionMiddleware),
+        Middleware(
+            ConditionalGetMiddleware,
+            version=data_version,
+            deploy=source_version(Path(__file__).parent, Path(employee_events.__file__).parent),
+            paths=('/',),
+            prefixes=('/employee/', '/team/', '/fragment/', '/notes/',
+                      '/search/', '/search_notes/', '/update_dropdown'),
+        ),
+    ],
+)
 
 # Initialize the `Report` class
 report = Report()
 
 
+def page_shell(app, title='FastHTML page'):
+    """
+    Returns the markup FastHTML places before and after the
+    body of a full page, built from the app's headers,
+    footers and attributes the same way it wraps a
+    component returned by a route.
+    Args:
+        app: The FastHTML app.
+        title: The page title, FastHTML's default if not given.
+    """
+    marker = '<!-- body -->'
+    page = Html(
+        Head(Title(title), *flat_xt(app.hdrs)),
+        Body(NotStr(marker), *flat_xt(app.ftrs), **app.bodykw),
+        **app.htmlkw
+    )
+    head, tail = to_xml(page, indent=fh_cfg.indent).split(marker)
+    return head, tail
+
+
+def stream_page(r, component, entity_id, model, title='FastHTML page'):
+    """
+    Stream a combined component inside the app's page
+    layout, sending each child as soon as it is rendered.
+    Args:
+        r: The request object.
+        component: The combined component to render.
+        entity_id: The ID of the employee or team.
+        model: The model to pass to the component.
+        title: The page title.
+    """
+    if 'hx-request' in r.headers:
+        head, tail = '', ''
+    else:
+        head, tail = page_shell(app, title)
+
+    async def chunks():
+        yield head
+        async for chunk in component.astream(entity_id, model):
+            yield chunk
+        yield tail
+
+    return StreamingResponse(chunks(), media_type='text/html')
+
+
 # Create a route for a get request
 # Set the route's path to the root
 @app.route('/')
-def get():
+async def get(r):
     """
     Render the report component
     Args:
         r: The request object.
     """
 
-    # Call the initialized report
+    # Stream the initialized report
     # pass the integer 1 and an instance
     # of the Employee class as arguments
     # Return the result
-    return report("1", Employee())
+    return stream_page(r, report, "1", Employee())
 
 
 # Create a route for a get request
@@ -366,7 +608,7 @@ def get():
 # parameterize the employee ID
 # to a string datatype
 @app.get('/employee/{id:str}')
-def employee_report(id: str):
+async def employee_report(r, id: str):
     """
     Render the report component for an employee.
     Args:
@@ -374,11 +616,11 @@ def employee_report(id: str):
         id: The ID of the employee.
     """
 
-    # Call the initialized report
+    # Stream the initialized report
     # pass the ID and an instance
     # of the Employee SQL class as arguments
     # Return the result
-    return report(id, Employee())
+    return stream_page(r, report, id, Employee())
 
 # Create a route for a get request
 # Set the route's path to receive a request
@@ -390,34 +632,132 @@ def employee_report(id: str):
 
 
 @app.get('/team/{id:str}')
-def team_report(id: str):
+async def team_report(r, id: str):
     """
     Render the report component for a team.
     Args:
         r: The request object.
         id: The ID of the team.
     """
-    # Call the initialized report
+    # Stream the initialized report
     # pass the id and an instance
     # of the Team SQL class as arguments
     # Return the result
-    return report(id, Team())
+    return stream_page(r, report, id, Team())
 
 
 # Keep the below code unchanged!
 @app.get('/update_dropdown{r}')
-def update_dropdown(r):
+async def update_dropdown(r):
     dropdown = DashboardFilters.children[1]
     print('PARAM', r.query_params['profile_type'])
     if r.query_params['profile_type'] == 'Team':
-        return dropdown(None, Team())
+        return await dropdown.acall(None, Team())
     elif r.query_params['profile_type'] == 'Employee':
-        return dropdown(None, Employee())
+        return await dropdown.acall(None, Employee())
+
+
+# Models for the `name` parameter of the routes below
+models = {
+    'employee': Employee,
+    'team': Team,
+}
+
+
+# Serve the names matching the text typed
+# in the dropdown's search box
+@app.get('/search/{model}')
+async def search(r, model: str):
+    if model not in models:
+        return Response(status_code=404)
+    dropdown = DashboardFilters.children[1]
+    matches = await models[model]().asearch(r.query_params.get('q', ''), dropdown.limit)
+    return tuple(dropdown.options(matches, None))
+
+
+# Table of the notes matching a full-text search
+note_search_table = DataTable()
+
+
+# Search the text of the notes, optionally for one
+# employee or team (`id`) and a range of dates
+# (`since` and `until`, as YYYY-MM-DD)
+@app.get('/search_notes/{model}')
+async def search_notes(r, model: str):
+    if model not in models:
+        return Response(status_code=404)
+    params = r.query_params
+    results = await models[model]().asearch_notes(
+        params.get('q', ''),
+        id=params.get('id') or None,
+        since=params.get('since') or None,
+        until=params.get('until') or None,
+    )
+    return note_search_table.table(results)
+
+
+# Serve the notes that follow the `after` cursor
+# for the notes table's "load more" button
+@app.get('/notes/{name}/{id}')
+async def notes_page(r, name: str, id: str):
+    if name not in models:
+        return Response(status_code=404)
+    notes_table = Report.children[3]
+
+    # The cursor is the (note_date, note_id) pair
+    # of the last note on the previous page
+    after = r.query_params.getlist('after')
+    if after and (len(after) != 2 or not after[1].isdigit()):
+        return Response("Invalid cursor", status_code=400)
+    return await notes_table.apage(id, models[name](), after or None)
+
+
+# Components served by the route below,
+# the same instances the report renders
+fragments = {
+    component.fragment_name: component
+    for component in (*Visualizations.children, Report.children[3])
+}
+
+
+# Render one deferred component for the
+# placeholder the report left in its place
+@app.get('/fragment/{component}/{model}/{id}')
+async def fragment(component: str, model: str, id: str):
+    if component not in fragments or model not in models or not id.isdigit():
+        return Response(status_code=404)
+    return await fragments[component].acall(id, models[model]())
+
+
+# Serve a chart image. The file name is a hash of the
+# chart, the entity and the data version, so the image
+# at a URL never changes and is cached for a year
+@app.get('/chart/{component}/{model}/{id}/{key}')
+async def chart(r, component: str, model: str, id: str, key: str):
+    viz = fragments.get(component)
+    if not isinstance(viz, MatplotlibViz) or model not in models or not id.isdigit():
+        return Response(status_code=404)
+
+    entity = models[model]()
+    current = viz.image_key(id, entity)
+    if key != current:
+        # The data changed since the page was rendered
+        return RedirectResponse(viz.image_src(id, entity), status_code=307)
+
+    headers = {
+        'ETag': f'"{current}"',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+    }
+    if etag_matches(r.headers.get('if-none-match'), headers['ETag']):
+        return Response(status_code=304, headers=headers)
+
+    image = await viz.aimage(id, entity, current)
+    return Response(image, media_type=MEDIA_TYPES[current.rsplit('.', 1)[1]],
+                    headers=headers)
 
 
 @app.post('/update_data')
 async def update_data(r):
-    from fasthtml.common import RedirectResponse
     data = await r.form()
     profile_type = data._dict['profile_type']
     id = data._dict['user-selection']
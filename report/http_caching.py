@@ -0,0 +1,241 @@
+"""
+ASGI middleware for conditional GET and response compression.
+
+`ConditionalGetMiddleware` answers repeated requests for pages
+whose data has not changed with `304 Not Modified` before the
+route runs, and `CompressionMiddleware` compresses text bodies
+with brotli (when installed) or gzip, flushing every chunk so
+streamed pages still arrive incrementally.
+"""
+from pathlib import Path
+import hashlib
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressed by `CompressionMiddleware`
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'image/svg+xml',
+    'application/json',
+    'application/javascript',
+)
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Returns True when an `If-None-Match` request
+    header lists `etag` or is `*`.
+    """
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(',')]
+    # Weak comparison, as allowed for If-None-Match
+    return '*' in candidates or etag.removeprefix('W/') in (
+        value.removeprefix('W/') for value in candidates)
+
+
+def source_version(*directories):
+    """
+    Returns a hash of the Python files under `directories`.
+    It is the same in every worker and after every restart
+    running the same code, and changes with each deploy.
+    """
+    digest = hashlib.sha256()
+    for directory in directories:
+        for path in sorted(Path(directory).rglob('*.py')):
+            digest.update(path.as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def request_headers(scope):
+    return {
+        name.decode('latin-1'): value.decode('latin-1')
+        for name, value in scope['headers']
+    }
+
+
+def add_vary(headers, value):
+    # Appends `value` to the Vary header in a list
+    # of raw (name, value) response headers
+    for position, (name, existing) in enumerate(headers):
+        if name.lower() == b'vary':
+            headers[position] = (name, existing + b', ' + value.encode())
+            return
+    headers.append((b'vary', value.encode()))
+
+
+class ConditionalGetMiddleware:
+    """
+    Validates GET requests for one of `paths`, or for paths
+    starting with one of `prefixes`, against `version()`, a
+    marker that changes whenever the data behind the pages
+    does, and `deploy`, a marker of the code rendering them,
+    such as `source_version` of the app's directories.
+
+    A matching `If-None-Match` header gets a 304 without
+    calling the app. Other responses get an `ETag` for the
+    next request. `If-Modified-Since` is not used, as a
+    timestamp cannot tell deploys or fragments apart.
+    """
+
+    def __init__(self, app, version, deploy='', paths=(), prefixes=()):
+        self.app = app
+        self.version = version
+        self.deploy = deploy
+        self.paths = set(paths)
+        self.prefixes = tuple(prefixes)
+
+    def etag(self, headers):
+        # HTMX requests get a fragment rather than
+        # the full page, so they are validated apart
+        fragment = 'hx-request' in headers
+        marker = f"{self.version()}|{self.deploy}|{fragment}"
+        return f'W/"{hashlib.sha256(marker.encode()).hexdigest()[:20]}"'
+
+    def not_modified(self, headers, etag):
+        return etag_matches(headers.get('if-none-match'), etag)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http'
+            or scope['method'] not in ('GET', 'HEAD')
+            or not (scope['path'] in self.paths
+                    or scope['path'].startswith(self.prefixes))
+        ):
+            return await self.app(scope, receive, send)
+
+        headers = request_headers(scope)
+        etag = self.etag(headers)
+        validators = [
+            (b'etag', etag.encode()),
+            (b'cache-control', b'no-cache'),
+        ]
+
+        if self.not_modified(headers, etag):
+            response_headers = list(validators)
+            add_vary(response_headers, 'HX-Request')
+            await send({'type': 'http.response.start', 'status': 304,
+                        'headers': response_headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async def send_with_validators(message):
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                response_headers = list(message.get('headers', []))
+                names = {name.lower() for name, _ in response_headers}
+                if b'etag' not in names:
+                    response_headers.extend(
+                        header for header in validators if header[0] not in names)
+                    add_vary(response_headers, 'HX-Request')
+                message = dict(message, headers=response_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
+
+
+class CompressionMiddleware:
+    """
+    Compresses text responses of at least `minimum_size` bytes
+    with brotli when the client accepts it and the `brotli`
+    package is installed, or with gzip otherwise.
+
+    Every chunk of a streamed response is flushed through the
+    compressor, so the client can render it right away.
+    """
+
+    def __init__(self, app, minimum_size=500, gzip_level=6, brotli_quality=5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def encoding(self, accept_encoding):
+        accepted = set()
+        for item in accept_encoding.split(','):
+            coding, _, params = item.strip().partition(';')
+            params = params.replace(' ', '')
+            try:
+                if params.startswith('q=') and float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(coding.strip().lower())
+
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    def compressor(self, encoding):
+        # Returns (compress, finish) functions for a new stream
+        if encoding == 'br':
+            stream = brotli.Compressor(quality=self.brotli_quality)
+            return (lambda data: stream.process(data) + stream.flush(),
+                    stream.finish)
+
+        stream = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return (lambda data: stream.compress(data) + stream.flush(zlib.Z_SYNC_FLUSH),
+                stream.flush)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        encoding = self.encoding(request_headers(scope).get('accept-encoding', ''))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compress = finish = None
+
+        async def send_compressed(message):
+            nonlocal start, compress, finish
+
+            if message['type'] == 'http.response.start':
+                # Wait for the first chunk to decide
+                start = message
+                return
+
+            if message['type'] != 'http.response.body':
+                return await send(message)
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+            if start is not None:
+                headers = list(start.get('headers', []))
+                response_start, start = start, None
+                names = {name.lower(): value for name, value in headers}
+                content_type = names.get(b'content-type', b'').decode('latin-1')
+
+                if (
+                    b'content-encoding' in names
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    await send(response_start)
+                    return await send(message)
+
+                headers = [(name, value) for name, value in headers
+                           if name.lower() != b'content-length']
+                headers.append((b'content-encoding', encoding.encode()))
+                add_vary(headers, 'Accept-Encoding')
+                await send(dict(response_start, headers=headers))
+                compress, finish = self.compressor(encoding)
+
+            if compress is None:
+                return await send(message)
+
+            data = compress(body)
+            if not more_body:
+                data += finish()
+            await send({'type': 'http.response.body', 'body': data,
+                        'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
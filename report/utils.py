@@ -1,5 +1,11 @@
+import json
+import logging
 import pickle
+import sqlite3
 from pathlib import Path
+import numpy as np
+
+logger = logging.getLogger(__name__)
 
 # Using the Path object, create a `project_root` variable
 # set to the absolute path for the root of this project directory
@@ -11,10 +17,133 @@ project_root = Path(__file__).resolve().parent.parent
 # inside the assets directory
 model_path = project_root / 'assets' / 'model.pkl'
 
+# Coefficients exported from `model.pkl` so the
+# dashboard can score without importing sklearn
+scorer_path = project_root / 'assets' / 'model.json'
 
-def load_model():
+
+class LogisticScorer:
+    """
+    Vectorized NumPy replacement for a fitted
+    sklearn LogisticRegression with the same
+    `predict_proba` and `predict` interface.
+    """
+
+    def __init__(self, coef, intercept, classes=(0, 1), feature_names=None):
+        self.coef_ = np.asarray(coef, dtype=float).reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype=float).reshape(1)
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = (
+            None if feature_names is None else list(feature_names)
+        )
+
+    @classmethod
+    def from_model(cls, model):
+        feature_names = getattr(model, 'feature_names_in_', None)
+        return cls(
+            model.coef_,
+            model.intercept_,
+            model.classes_.tolist(),
+            None if feature_names is None else feature_names.tolist(),
+        )
+
+    @classmethod
+    def load(cls, path=scorer_path):
+        with Path(path).open('r') as file:
+            return cls(**json.load(file))
+
+    def save(self, path=scorer_path):
+        params = dict(
+            coef=self.coef_.ravel().tolist(),
+            intercept=self.intercept_.tolist(),
+            classes=self.classes_.tolist(),
+            feature_names=self.feature_names_in_,
+        )
+        with Path(path).open('w') as file:
+            json.dump(params, file, indent=2)
+
+    def _features(self, X):
+        # Match sklearn by selecting named columns
+        # from dataframes in the order they were fit
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[self.feature_names_in_]
+        return np.asarray(X, dtype=float)
+
+    def decision_function(self, X):
+        return self._features(X) @ self.coef_[0] + self.intercept_[0]
+
+    def predict_proba(self, X):
+        z = self.decision_function(X)
+        # Numerically stable logistic sigmoid
+        positive = np.exp(-np.logaddexp(0, -z))
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+def verify_parity(model, scorer, X, atol=1e-9):
+    """
+    Raise a ValueError if `scorer` and `model` disagree
+    on the probabilities they predict for `X`.
+    """
+    expected = model.predict_proba(X)
+    actual = scorer.predict_proba(X)
+    error = np.abs(expected - actual).max()
+    if error > atol:
+        raise ValueError(
+            f"Exported scorer differs from the model by {error:g}")
+    return error
+
+
+def export_model(model, X, path=scorer_path):
+    """
+    Export a fitted LogisticRegression to the
+    sklearn-free JSON format after checking that it
+    scores `X` the same as the original model.
+    """
+    scorer = LogisticScorer.from_model(model)
+    verify_parity(model, scorer, X)
+    scorer.save(path)
+
+    # Round trip the saved file to catch serialization loss
+    verify_parity(model, LogisticScorer.load(path), X)
+    return scorer
+
+
+def load_pickled_model():
 
     with model_path.open('rb') as file:
         model = pickle.load(file)
 
     return model
+
+
+def load_model():
+    """
+    Returns the NumPy scorer when it has been exported
+    and the pickled sklearn model otherwise.
+    """
+    if scorer_path.exists():
+        return LogisticScorer.load()
+    return load_pickled_model()
+
+
+def refresh_risk_scores():
+    """
+    Recompute the precomputed recruitment risk scores
+    if the model file or the events have changed since
+    they were last stored. A database that cannot be
+    written, because it is read-only or another worker
+    holds the lock, is left as it is, and the charts
+    score inline what has no stored score.
+    """
+    from employee_events import risk_scores
+
+    model_file = scorer_path if scorer_path.exists() else model_path
+    try:
+        return risk_scores.refresh(model_file, loader=load_model)
+    except sqlite3.OperationalError as error:
+        logger.warning("Could not refresh the risk scores: %s", error)
+        return False
+
@@ -0,0 +1,216 @@
+"""
+Vectorized generator for the synthetic employee_events dataset.
+
+Every value is drawn from a seeded `numpy.random.Generator` in
+whole arrays, one weekday and profile at a time, and the events
+are yielded in chunks of many days, so adding employees makes
+the arrays longer instead of running more Python per event.
+
+    data = SyntheticData(seed=7, employees=10_000, teams=200,
+                         start='2020-01-01', end='2024-12-31')
+    for chunk in data.events(chunk_rows=1_000_000):
+        ...
+"""
+from datetime import date, timedelta
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+data_path = Path(__file__).resolve().parent / 'generated_data'
+
+# Last event date when none is given, fixed so a seed
+# always produces the same dataset
+DEFAULT_END = '2024-12-31'
+
+EVENT_COLUMNS = ['event_date', 'employee_id', 'team_id',
+                 'positive_events', 'negative_events']
+
+
+def left_skew(rng, loc, size, spread=3.1):
+    """
+    Integers from 0 to `loc` piled up near `loc` with a thin
+    tail towards 0. Matches the old approach of rescaling a
+    sample of a strongly left skewed normal to [0, loc], where
+    `spread` is the typical range of 500 half-normal draws.
+    """
+    tail = np.abs(rng.standard_normal(size))
+    return (loc * np.clip(1 - tail / spread, 0, 1)).astype(int)
+
+
+def sometimes(rng, size, values, p):
+    """
+    0 with probability `1 - p`, otherwise one of `values`.
+    """
+    spikes = rng.choice(values, size=size)
+    return np.where(rng.random(size) < p, spikes, 0)
+
+
+# Each profile draws `size` positive and negative daily event
+# counts at once and gives the chance of being recruited.
+# Draws are truncated to integers like the original scalar
+# `scipy.stats` calls.
+PROFILES = {
+    'good': dict(
+        positive=lambda rng, size: rng.normal(rng.normal(4, 1, size), 1).astype(int),
+        negative=lambda rng, size: rng.exponential(rng.choice([.5, 1], size)).astype(int),
+        chance=.5,
+    ),
+    'normal': dict(
+        positive=lambda rng, size: rng.normal(rng.normal(3, 1, size), 1).astype(int),
+        negative=lambda rng, size: rng.normal(2, rng.choice([.5, 1, 2, 3], size)).astype(int),
+        chance=.15,
+    ),
+    'poor': dict(
+        positive=lambda rng, size: rng.exponential(.5, size).astype(int),
+        negative=lambda rng, size: rng.normal(.5, 1, size).astype(int),
+        chance=.1,
+    ),
+    'chaotic_good': dict(
+        positive=lambda rng, size: left_skew(rng, 5, size),
+        negative=lambda rng, size: sometimes(rng, size, [50, 200], .02),
+        chance=.2,
+    ),
+    'chaotic_bad': dict(
+        positive=lambda rng, size: rng.exponential(5, size).astype(int),
+        negative=lambda rng, size: left_skew(rng, 10, size),
+        chance=.2,
+    ),
+}
+
+
+def load_json(name):
+    with (data_path / f'{name}.json').open('r') as file:
+        return json.load(file)
+
+
+class SyntheticData:
+    """
+    Seeded synthetic employees, teams, daily events and notes.
+
+    The first employees and teams use the names in
+    `generated_data`, the rest are made up from them.
+    Events are recorded on every weekday from `start` to
+    `end`, which default to the year up to `DEFAULT_END`.
+    """
+
+    def __init__(self, seed=0, employees=25, teams=5, start=None, end=None):
+        self.seed = seed
+        self.employee_count = employees
+        self.team_count = teams
+        self.end = np.datetime64(end or DEFAULT_END, 'D')
+        self.start = np.datetime64(start or (self.end.astype(date) - timedelta(days=365)), 'D')
+
+        days = np.arange(self.start, self.end + 1)
+        self.days = days[np.is_busday(days)]
+
+        # Employees and teams come from one stream and
+        # events from another, so changing the date span
+        # keeps the same people and teams
+        people, self._event_seed = np.random.SeedSequence(seed).spawn(2)
+        rng = np.random.default_rng(people)
+
+        self.profile_names = list(PROFILES)
+        self.profile = rng.integers(len(PROFILES), size=employees)
+        self.team_id = rng.integers(1, teams + 1, size=employees)
+        chances = np.array([PROFILES[name]['chance'] for name in self.profile_names])
+        self.recruited = (rng.random(employees) < chances[self.profile]).astype(int)
+
+        sources = load_json('employees')
+        names = [source['name'].split() for source in sources]
+        firsts = [name[0] for name in names]
+        lasts = [name[-1] for name in names]
+        extra = max(employees - len(names), 0)
+        self.first_name = (firsts + list(rng.choice(firsts, extra)))[:employees]
+        self.last_name = (lasts + list(rng.choice(lasts, extra)))[:employees]
+        self.note_text = [sources[i % len(sources)]['notes'] for i in range(employees)]
+
+        managers = load_json('managers')
+        self.manager_name = list(rng.choice(managers, teams))
+
+        # Note dates are drawn with the people so they do
+        # not depend on how the events are chunked
+        counts = [len(notes) for notes in self.note_text]
+        self.note_day = rng.integers(len(self.days), size=sum(counts)) if len(self.days) else []
+
+    @property
+    def employee_ids(self):
+        return np.arange(1, self.employee_count + 1)
+
+    def employees(self):
+        return pd.DataFrame({
+            'employee_id': self.employee_ids,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'team_id': self.team_id,
+        })
+
+    def teams(self):
+        team_names = load_json('team_names')
+        shifts = load_json('shifts')
+        team_ids = np.arange(1, self.team_count + 1)
+        return pd.DataFrame({
+            'team_id': team_ids,
+            'team_name': [
+                team_names[i - 1] if i <= len(team_names) else f'Team {i}'
+                for i in team_ids
+            ],
+            'shift': [shifts[(i - 1) % len(shifts)] for i in team_ids],
+            'manager_name': self.manager_name,
+        })
+
+    def notes(self):
+        employee_ids = np.repeat(self.employee_ids,
+                                 [len(notes) for notes in self.note_text])
+        return pd.DataFrame({
+            'employee_id': employee_ids,
+            'team_id': self.team_id[employee_ids - 1],
+            'note': [note for notes in self.note_text for note in notes],
+            'note_date': np.datetime_as_string(self.days[self.note_day], unit='D'),
+        })
+
+    def recruitment(self):
+        return pd.Series(self.recruited, index=pd.Index(self.employee_ids, name='employee_id'),
+                         name='recruited')
+
+    def day_rng(self, day):
+        """
+        Random generator for the events of the `day`th weekday.
+        """
+        seed = self._event_seed
+        return np.random.default_rng(np.random.SeedSequence(
+            seed.entropy, spawn_key=seed.spawn_key + (day,)))
+
+    def events(self, chunk_rows=1_000_000):
+        """
+        Yield the daily events as dataframes of about
+        `chunk_rows` rows, ordered by date and employee.
+        """
+        days_per_chunk = max(chunk_rows // max(self.employee_count, 1), 1)
+        members = [np.flatnonzero(self.profile == index)
+                   for index in range(len(self.profile_names))]
+
+        for first in range(0, len(self.days), days_per_chunk):
+            days = self.days[first:first + days_per_chunk]
+            shape = (len(days), self.employee_count)
+            positive = np.empty(shape, dtype=np.int64)
+            negative = np.empty(shape, dtype=np.int64)
+
+            # Every day has its own random stream, so the
+            # events do not depend on `chunk_rows`. Each
+            # profile is drawn for all its employees at once.
+            for row, day in enumerate(range(first, first + len(days))):
+                rng = self.day_rng(day)
+                for name, columns in zip(self.profile_names, members):
+                    positive[row, columns] = PROFILES[name]['positive'](rng, len(columns))
+                    negative[row, columns] = PROFILES[name]['negative'](rng, len(columns))
+
+            yield pd.DataFrame({
+                'event_date': np.repeat(np.datetime_as_string(days, unit='D'),
+                                        self.employee_count),
+                'employee_id': np.tile(self.employee_ids, len(days)),
+                'team_id': np.tile(self.team_id, len(days)),
+                'positive_events': positive.ravel(),
+                'negative_events': negative.ravel(),
+            }, columns=EVENT_COLUMNS)
@@ -1,3 +1,4 @@
+import os
 import pytest
 from pathlib import Path
 
@@ -92,3 +93,693 @@ def test_employee_events_table_exists(table_names):
     # is in the table_names list
     assert 'employee_events' in table_names, \
     "Employee events table does not exist"
+
+
+def test_pool_reuses_connections(db_path):
+    """
+    Test that repeated queries share pooled connections.
+    """
+    from employee_events import ConnectionPool
+
+    pool = ConnectionPool(db_path, size=2)
+    for _ in range(5):
+        with pool.connection() as conn:
+            conn.execute("SELECT 1").fetchall()
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['reused'] == 4
+    assert stats['in_use'] == 0
+
+
+def test_pool_connections_are_read_only(db_path):
+    """
+    Test that pooled connections refuse writes.
+    """
+    import sqlite3
+    from employee_events import ConnectionPool
+
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE should_fail (x INTEGER)")
+
+
+def test_pool_times_out_when_exhausted(db_path):
+    """
+    Test that a full pool raises instead of opening
+    more connections than its size.
+    """
+    from employee_events import ConnectionPool
+
+    pool = ConnectionPool(db_path, size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_statements_are_parameterized():
+    """
+    Test that every declared statement binds its ids
+    and renders to the same sql text for every id.
+    """
+    from employee_events import Employee, Team
+
+    for model in (Employee, Team):
+        for key, statement in model.sql.items():
+            assert '{' not in statement, f"{model.name}.{key} is unformatted"
+
+    assert Employee().username(3) == Employee().username("3")
+    assert len(Employee().username(1)) == 1
+
+
+def test_async_queries_match_sync_queries():
+    """
+    Test that the async query methods return the same
+    results as their blocking counterparts.
+    """
+    import asyncio
+    from employee_events import Employee, Team
+
+    async def run(model):
+        return await asyncio.gather(
+            model.anames(),
+            model.ausername(1),
+            model.anotes(1),
+            model.acumulative_event_counts(1),
+            model.arisk_score(1),
+        )
+
+    for model in (Employee(), Team()):
+        names, username, notes, counts, score = asyncio.run(run(model))
+        assert names == model.names()
+        assert username == model.username(1)
+        assert notes.equals(model.notes(1))
+        assert counts.equals(model.cumulative_event_counts(1))
+        assert score == model.risk_score(1)
+
+
+def test_notes_pages_cover_every_note():
+    """
+    Test that following the keyset cursors returns every
+    note once, in the same order as `notes`.
+    """
+    import pandas as pd
+    from employee_events import Team
+
+    team = Team()
+    pages, cursor = [], None
+    while True:
+        page, cursor = team.notes_page(1, cursor, limit=7)
+        assert len(page) <= 7
+        pages.append(page)
+        if cursor is None:
+            break
+
+    assert len(pages) > 1
+    paged = pd.concat(pages, ignore_index=True)
+    assert paged.equals(team.notes(1))
+
+
+def test_notes_pages_include_undated_notes(db_path, tmp_path):
+    """
+    Test that notes without a date are paged
+    first instead of being skipped.
+    """
+    import shutil
+    from sqlite3 import connect
+    from employee_events import Employee, pool
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    conn = connect(copy)
+    conn.execute("INSERT INTO notes (employee_id, team_id, note, note_date) "
+                 "VALUES (1, 1, 'Undated', NULL)")
+    conn.commit()
+    conn.close()
+
+    pool.retarget(f"{copy.as_uri()}?mode=ro")
+    try:
+        employee = Employee()
+        page, cursor = employee.notes_page(1, limit=1)
+        assert page['note'].tolist() == ['Undated']
+        assert cursor is not None
+
+        notes = []
+        while cursor is not None:
+            page, cursor = employee.notes_page(1, cursor, limit=2)
+            notes += page['note'].tolist()
+        assert notes == employee.notes(1)['note'].tolist()[1:]
+    finally:
+        pool.retarget(None)
+
+
+def test_notes_pages_are_read_in_index_order(db_conn):
+    """
+    Test that a notes page is read from the notes
+    index in order instead of sorting every note.
+    """
+    from employee_events import Employee, Team
+
+    for model in (Employee, Team):
+        for cursor_date in (None, '2023-01-01'):
+            plan = db_conn.execute(
+                f"EXPLAIN QUERY PLAN {model.sql['notes_page']}",
+                (1, cursor_date, cursor_date, 0, cursor_date, 10),
+            ).fetchall()
+            details = ' '.join(row[-1] for row in plan)
+            assert f"notes_{model.name}_date" in details
+            assert 'TEMP B-TREE' not in details
+
+
+def test_search_matches_name_prefixes(db_conn):
+    """
+    Test that search returns the first names starting
+    with a prefix, ignoring case, from an index range.
+    """
+    from employee_events import Employee, Team
+
+    employee = Employee()
+    names = sorted(employee.names(), key=lambda row: row[0].lower())
+    for prefix in ('', 'a', 'Li', 'CALVIN C', 'zz'):
+        expected = [row for row in names
+                    if row[0].lower().startswith(prefix.lower())][:3]
+        assert employee.search(prefix, limit=3) == expected
+
+    assert Team().search('bra') == [('Bravo Team', 2)]
+
+    plan = db_conn.execute(
+        "EXPLAIN QUERY PLAN " + Employee.sql['search'], ('a', 'b', 3)
+    ).fetchall()
+    assert 'employee_name_search' in plan[0][3]
+
+
+def test_search_notes_follows_note_changes(db_path, tmp_path):
+    """
+    Test that the full-text index answers filtered searches
+    and picks up notes as they are inserted, edited and deleted.
+    """
+    import shutil
+    import sqlite3
+    from employee_events import Team
+    from employee_events.query_base import fts_query
+
+    assert fts_query('fix "machine (AND') == '"fix" "machine" "AND"'
+
+    results = Team().search_notes('machine', id=2, since='2024-01-01')
+    assert len(results) and results['team'].eq('Bravo Team').all()
+    assert (results['note_date'] >= '2024-01-01').all()
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    connection = sqlite3.connect(copy)
+
+    def matches(word):
+        return connection.execute(
+            "SELECT rowid FROM notes_search WHERE notes_search MATCH ?",
+            (fts_query(word),)).fetchall()
+
+    with connection:
+        connection.execute(
+            "INSERT INTO notes (note_id, employee_id, team_id, note, note_date) "
+            "VALUES (1000, 1, 1, 'Recalibrated the widgets', '2024-11-01')")
+    assert matches('widget') == [(1000,)]
+
+    with connection:
+        connection.execute(
+            "UPDATE notes SET note = 'Oiled the gears' WHERE note_id = 1000")
+    assert matches('widget') == [] and matches('gears') == [(1000,)]
+
+    with connection:
+        connection.execute("DELETE FROM notes WHERE note_id = 1000")
+    assert matches('gears') == []
+    connection.close()
+
+
+def test_event_store_matches_sql(db_path, tmp_path):
+    """
+    Test that the in-memory event store returns the same
+    dataframes as the sql queries, and reloads after the
+    database changes.
+    """
+    import shutil
+    import sqlite3
+    from employee_events import Employee, Team, EventStore
+
+    store = EventStore(db_path)
+    for model in (Employee(), Team()):
+        for id in (1, 2):
+            for method in ('event_counts', 'cumulative_event_counts', 'model_data'):
+                expected = getattr(model, method)(id)
+                assert getattr(store, method)(model.name, id).equals(expected)
+
+    # Ids that are not numbers match nothing, as in SQL
+    assert store.event_counts('employee', 'abc').empty
+    assert store.model_data('team', 'abc').empty
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    store = EventStore(copy)
+    before = store.model_data('employee', 1)
+
+    with sqlite3.connect(copy) as connection:
+        connection.execute(
+            "INSERT INTO employee_events VALUES ('2030-01-01', 1, 1, 5, 0)")
+    os.utime(copy, ns=(0, os.stat(copy).st_mtime_ns + 10**9))
+
+    after = store.model_data('employee', 1)
+    assert after['positive_events'][0] == before['positive_events'][0] + 5
+    assert store.event_counts('employee', 1)['event_date'].iat[-1] == '2030-01-01'
+
+
+def test_event_store_reads_through_the_pool(db_path, tmp_path):
+    """
+    Test that the packaged database's event store loads
+    from whatever the shared pool reads, such as a replica.
+    """
+    import shutil
+    import sqlite3
+    from employee_events import EventStore, pool
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    with sqlite3.connect(copy) as connection:
+        connection.execute(
+            "INSERT INTO employee_events VALUES ('2031-01-01', 1, 1, 5, 0)")
+
+    pool.retarget(f"{copy.as_uri()}?mode=ro")
+    try:
+        counts = EventStore().event_counts('employee', 1)
+    finally:
+        pool.retarget(None)
+    assert counts['event_date'].iat[-1] == '2031-01-01'
+
+
+def test_replica_swaps_after_rebuild(db_path, tmp_path):
+    """
+    Test that the pool reads an in-memory replica, keeps
+    serving it while the file is being rebuilt, and moves
+    to a new replica once the rebuilt file is complete.
+    """
+    import shutil
+    import sqlite3
+    import time
+    from employee_events import ConnectionPool, Replica
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    pool = ConnectionPool(copy)
+    replica = Replica(copy, pool, interval=0.05).start()
+
+    def note_count():
+        with pool.connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return condition()
+
+    try:
+        assert 'mode=memory' in pool.uri()
+        count = note_count()
+
+        # A half written file is never swapped in
+        copy.unlink()
+        with sqlite3.connect(copy) as connection:
+            connection.execute("CREATE TABLE team (team_id INTEGER)")
+        time.sleep(0.3)
+        assert note_count() == count
+
+        shutil.copy(db_path, copy)
+        with sqlite3.connect(copy) as connection:
+            connection.execute(
+                "INSERT INTO notes (employee_id, team_id, note, note_date) "
+                "VALUES (1, 1, 'Rebuilt', '2030-01-01')")
+        assert wait_for(lambda: note_count() == count + 1)
+    finally:
+        replica.stop()
+
+    assert 'mode=ro' in pool.uri()
+
+
+def test_db_is_migrated(db_conn):
+    """
+    Test that the packaged database is at the latest
+    schema version and has its covering indexes.
+    """
+    from employee_events.migrations import latest_version, schema_version
+
+    assert schema_version(db_conn) == latest_version()
+    index_names = [
+        row[0] for row in
+        db_conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+    ]
+    assert 'employee_events_team_cover' in index_names
+
+
+def test_upgrade_is_idempotent(db_path, tmp_path):
+    """
+    Test that upgrading an up to date copy applies nothing.
+    """
+    import shutil
+    from employee_events.migrations import upgrade
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    assert upgrade(copy) == []
+
+
+def test_rollups_follow_inserted_events(db_path, tmp_path):
+    """
+    Test that the rollup tables stay equal to a fresh
+    aggregation of employee_events after new rows,
+    including a backfilled day, are inserted.
+    """
+    import shutil
+    from sqlite3 import connect
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    conn = connect(copy)
+
+    last_date, = conn.execute(
+        "SELECT MAX(event_date) FROM employee_events").fetchone()
+    conn.executemany(
+        "INSERT INTO employee_events VALUES (?, ?, ?, ?, ?)",
+        [('2099-01-01', 1, 1, 5, 2), ('2099-01-01', 2, 1, 1, 1),
+         ('1999-01-01', 1, 1, 3, 4), (last_date, 999, 1, 7, 7)],
+    )
+    conn.commit()
+
+    expected = conn.execute("""
+        SELECT team_id, event_date,
+               SUM(positive_events), SUM(negative_events),
+               SUM(SUM(positive_events)) OVER w,
+               SUM(SUM(negative_events)) OVER w
+        FROM employee_events
+        GROUP BY team_id, event_date
+        WINDOW w AS (PARTITION BY team_id ORDER BY event_date)
+        ORDER BY team_id, event_date
+    """).fetchall()
+    actual = conn.execute(
+        "SELECT * FROM team_daily_events ORDER BY team_id, event_date"
+    ).fetchall()
+    assert actual == expected
+
+    expected = conn.execute("""
+        SELECT team_id, employee_id,
+               SUM(positive_events), SUM(negative_events)
+        FROM employee_events
+        GROUP BY team_id, employee_id
+    """).fetchall()
+    actual = conn.execute(
+        "SELECT * FROM employee_totals ORDER BY team_id, employee_id"
+    ).fetchall()
+    assert actual == expected
+
+
+class FakePredictor:
+    """
+    Stand-in model whose probability is the share
+    of positive events.
+    """
+    calls = 0
+
+    def predict_proba(self, X):
+        import numpy as np
+        FakePredictor.calls += 1
+        X = np.asarray(X, dtype=float)
+        p = X[:, 0] / X.sum(axis=1)
+        return np.column_stack([1 - p, p])
+
+
+def test_risk_scores_recompute_only_when_stale(db_path, tmp_path):
+    """
+    Test that every entity is scored in one call and that
+    scores are only recomputed after events change.
+    """
+    import shutil
+    from sqlite3 import connect
+    from employee_events.risk_scores import score_all
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    FakePredictor.calls = 0
+
+    assert score_all(FakePredictor(), 'test', copy)
+    assert FakePredictor.calls == 1
+    assert not score_all(FakePredictor(), 'test', copy)
+
+    conn = connect(copy)
+    team_score, = conn.execute(
+        "SELECT score FROM risk_scores WHERE entity='team' AND entity_id=1"
+    ).fetchone()
+    expected, = conn.execute("""
+        SELECT AVG(positive_events * 1.0 / (positive_events + negative_events))
+        FROM employee_totals WHERE team_id = 1
+    """).fetchone()
+    assert abs(team_score - expected) < 1e-9
+
+    conn.execute("INSERT INTO employee_events VALUES ('2099-01-01', 1, 1, 1, 1)")
+    conn.commit()
+    assert score_all(FakePredictor(), 'test', copy)
+
+
+def test_import_is_lazy():
+    """
+    Test that importing the package and its query classes
+    does not import pandas.
+    """
+    import subprocess
+    import sys
+
+    code = (
+        "import sys; from employee_events import Employee, Team; "
+        "assert 'pandas' not in sys.modules"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+
+def test_synthetic_data_is_seeded_and_chunked():
+    """
+    Test that the generator is reproducible from its seed
+    and that chunking does not change the events.
+    """
+    from importlib.util import spec_from_file_location, module_from_spec
+    import pandas as pd
+
+    spec = spec_from_file_location(
+        'synthetic_data', project_root / 'src' / 'synthetic_data.py')
+    synthetic_data = module_from_spec(spec)
+    spec.loader.exec_module(synthetic_data)
+
+    def generate(chunk_rows):
+        data = synthetic_data.SyntheticData(
+            seed=3, employees=40, teams=7, start='2024-01-01', end='2024-03-31')
+        return data, list(data.events(chunk_rows=chunk_rows))
+
+    data, chunks = generate(chunk_rows=200)
+    _, whole = generate(chunk_rows=10_000)
+
+    assert len(whole) == 1 and len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), whole[0])
+
+    # Every employee has one row per weekday
+    events = whole[0]
+    assert len(events) == 40 * len(data.days)
+    assert not pd.to_datetime(events.event_date).dt.dayofweek.ge(5).any()
+    assert set(data.teams().team_id) == set(range(1, 8))
+    assert set(data.notes().note_date) <= set(events.event_date)
+
+
+def test_staging_database_swaps_in_complete_database(tmp_path):
+    """
+    Test that chunks are bulk loaded into a migrated
+    database that only replaces the target on success.
+    """
+    from sqlite3 import connect
+    from employee_events.bulk_load import StagingDatabase
+    from employee_events.migrations import latest_version, schema_version
+    import pandas as pd
+
+    target = tmp_path / 'employee_events.db'
+    previous = connect(target)
+    previous.execute("CREATE TABLE previous (id)")
+    previous.close()
+    before = target.read_bytes()
+
+    events = pd.DataFrame({
+        'event_date': ['2024-01-01', '2024-01-02', '2024-01-01'],
+        'employee_id': [1, 1, 2],
+        'team_id': [1, 1, 1],
+        'positive_events': [3, 4, 5],
+        'negative_events': [0, 1, 2],
+    })
+
+    # A failed load leaves the target alone
+    with pytest.raises(RuntimeError):
+        with StagingDatabase(target) as staging:
+            staging.load('employee_events', [events])
+            raise RuntimeError
+    assert target.read_bytes() == before
+    assert not staging.path.exists()
+
+    with StagingDatabase(target) as staging:
+        staging.load('team', [[(1, 'Team', 'Day', 'Manager')]])
+        staging.load('employee', [[(1, 'Ada', 'Lovelace', 1), (2, 'Alan', 'Turing', 1)]])
+        staging.load('notes', [[(1, 1, 'Great week', '2024-01-02'),
+                                (2, 1, 'Standup', '2024-01-02'),
+                                (2, 1, 'Standup', '2024-01-02')]])
+        # Chunks may be dataframes or iterables of rows
+        assert staging.load('employee_events', [events[:2], events[2:]]) == 3
+    assert not staging.path.exists()
+
+    conn = connect(target)
+    assert schema_version(conn) == latest_version()
+    assert conn.execute("""
+        SELECT cumulative_positive_events FROM employee_daily_events
+        WHERE employee_id = 1 AND event_date = '2024-01-02'
+    """).fetchone() == (7,)
+    assert conn.execute(
+        "SELECT rowid FROM notes_search WHERE notes_search MATCH 'great'"
+    ).fetchall() == [(1,)]
+    # Identical notes are kept
+    assert conn.execute("SELECT COUNT(*) FROM notes").fetchone() == (3,)
+    conn.close()
+
+
+def test_ingest_is_idempotent_and_bumps_version(db_path, tmp_path):
+    """
+    Test that ingested rows are appended once, update the
+    rollups and search index, bump the data version, and
+    do not wait for an open reader.
+    """
+    import shutil
+    from sqlite3 import connect
+    from employee_events.ingestion import ingest
+    from employee_events.sql_execution import data_version, file_version
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+
+    events = [('2099-01-01', 1, 1, 2, 1), ('2099-01-02', 1, 1, 3, 0)]
+    notes = [(1, 1, 'Mentored the zeppelin project', '2099-01-02')]
+
+    first = ingest(events, notes, database=copy)
+    assert (first['events'], first['notes']) == (2, 1)
+
+    # A reader in the middle of a transaction does
+    # not block the next ingestion in WAL mode
+    reader = connect(f"{copy.as_uri()}?mode=ro", uri=True)
+    reader.execute("BEGIN")
+    reader.execute("SELECT COUNT(*) FROM employee_events").fetchone()
+    before = file_version(copy)
+
+    again = ingest(events, notes, database=copy)
+    assert (again['events'], again['notes']) == (0, 0)
+    assert again['skipped'] and again['batch'] == first['batch']
+    assert again['version'] == first['version']
+
+    later = ingest([('2099-01-03', 1, 1, 1, 1)], database=copy)
+    assert later['version'] == first['version'] + 1
+    assert file_version(copy) != before
+    assert data_version(copy).endswith(f"-{later['version']}")
+    reader.close()
+
+    conn = connect(copy)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ('wal',)
+    assert conn.execute("""
+        SELECT positive_events FROM employee_daily_events
+        WHERE employee_id = 1 AND event_date = '2099-01-02'
+    """).fetchone() == (3,)
+    assert conn.execute(
+        "SELECT COUNT(*) FROM notes_search WHERE notes_search MATCH 'zeppelin'"
+    ).fetchone() == (1,)
+    conn.close()
+
+
+def test_ingest_refuses_conflicting_events(db_path, tmp_path):
+    """
+    Test that batches are identified by their id, that an
+    event contradicting a stored day fails the whole batch,
+    and that identical notes from separate batches are kept.
+    """
+    import shutil
+    from sqlite3 import connect
+    from employee_events.ingestion import ingest, main
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    note = (1, 1, 'Weekly sync', '2099-01-01')
+
+    first = ingest([('2099-01-01', 1, 1, 2, 1)], [note], database=copy, batch_id='monday')
+    assert (first['events'], first['notes']) == (1, 1)
+    assert ingest(database=copy, batch_id='monday')['skipped']
+
+    # A correction for a stored day is not silently dropped
+    with pytest.raises(ValueError, match="employee 1 on 2099-01-01"):
+        ingest([('2099-01-02', 1, 1, 1, 0), ('2099-01-01', 1, 1, 5, 1)], [note],
+               database=copy)
+    with pytest.raises(ValueError):
+        ingest([('2099-01-03', 1, 1, 1, 0), ('2099-01-03', 1, 1, 2, 0)], database=copy)
+
+    # CSV values compare equal to the stored integers,
+    # so only the new day and the note are added
+    csv = tmp_path / 'events.csv'
+    csv.write_text("event_date,employee_id,team_id,positive_events,negative_events\n"
+                   "2099-01-01,1,1,2,1\n2099-01-02,1,1,1,0\n")
+    notes = tmp_path / 'notes.csv'
+    notes.write_text("employee_id,team_id,note,note_date\n1,1,Weekly sync,2099-01-01\n")
+    main([str(copy), '--events', str(csv), '--notes', str(notes)])
+
+    conn = connect(copy)
+    assert conn.execute(
+        "SELECT event_date, positive_events FROM employee_events "
+        "WHERE employee_id = 1 AND event_date LIKE '2099-%' ORDER BY event_date"
+    ).fetchall() == [('2099-01-01', 2), ('2099-01-02', 1)]
+    assert conn.execute(
+        "SELECT COUNT(*) FROM notes WHERE note = 'Weekly sync'").fetchone() == (2,)
+    assert conn.execute(
+        "SELECT batch_id, events, notes FROM ingested_batches WHERE batch_id = 'monday'"
+    ).fetchone() == ('monday', 1, 1)
+    conn.close()
+
+
+def test_staging_database_does_not_swap_over_an_open_log(db_path, tmp_path):
+    """
+    Test that the swap fails, leaving the target intact,
+    while a reader keeps the target's write-ahead log.
+    """
+    import shutil
+    from sqlite3 import connect
+    from employee_events.bulk_load import StagingDatabase
+    from employee_events.ingestion import ingest
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    ingest([('2099-01-01', 1, 1, 2, 1)], database=copy)
+
+    # The reader's snapshot predates the last ingestion,
+    # whose rows cannot be checkpointed until it ends
+    reader = connect(f"{copy.as_uri()}?mode=ro", uri=True)
+    reader.execute("BEGIN")
+    reader.execute("SELECT COUNT(*) FROM employee_events").fetchone()
+    ingest([('2099-01-02', 1, 1, 2, 1)], database=copy)
+
+    with pytest.raises(RuntimeError, match="write-ahead log"):
+        with StagingDatabase(copy, timeout=0.1) as staging:
+            staging.load('team', [[(1, 'Team', 'Day', 'Manager')]])
+    assert not staging.path.exists()
+
+    reader.close()
+
+    conn = connect(copy)
+    assert conn.execute(
+        "SELECT COUNT(*) FROM employee_events WHERE event_date LIKE '2099-%'"
+    ).fetchone() == (2,)
+    conn.close()
@@ -0,0 +1,614 @@
+import sys
+import pytest
+from pathlib import Path
+
+# The report modules import each other as top level
+# packages, so the report directory must be importable
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / 'report'))
+
+
+class FakeModel:
+    """
+    Minimal stand-in for an employee_events model.
+    """
+    name = "employee"
+    version = "v1"
+
+    def data_version(self):
+        return self.version
+
+
+def test_component_cache_reuses_until_data_changes():
+    """
+    Test that cached components are rendered once per
+    data version.
+    """
+    from base_components.component_cache import ComponentCache
+
+    cache = ComponentCache()
+    model = FakeModel()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return len(renders)
+
+    assert cache.get_or_render(object, 1, model, render) == 1
+    assert cache.get_or_render(object, 1, model, render) == 1
+    model.version = "v2"
+    assert cache.get_or_render(object, 1, model, render) == 2
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_component_cache_evicts_least_recently_used():
+    """
+    Test that the cache never holds more than `maxsize` entries.
+    """
+    from base_components.component_cache import ComponentCache
+
+    cache = ComponentCache(maxsize=2)
+    model = FakeModel()
+    for entity_id in range(3):
+        cache.get_or_render(object, entity_id, model, lambda: entity_id)
+
+    assert cache.stats()['size'] == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_svg_line_chart_draws_each_column():
+    """
+    Test that the SVG backend emits one polyline per column.
+    """
+    import pandas as pd
+    from base_components import svg_chart
+
+    df = pd.DataFrame(
+        {'Positive': [1, 3, 6], 'Negative': [0, 1, 1]},
+        index=['2024-01-01', '2024-01-02', '2024-01-03'],
+    )
+    svg = svg_chart.line_chart(df, title='Counts & Totals')
+
+    assert svg.startswith('<svg') and svg.endswith('</svg>')
+    assert svg.count('<polyline') == 2
+    assert 'Counts &amp; Totals' in svg
+
+
+def test_nice_ticks_cover_range():
+    """
+    Test that generated ticks include both ends of the data.
+    """
+    from base_components.svg_chart import nice_ticks
+
+    ticks = nice_ticks(0, 4360)
+    assert ticks[0] <= 0 and ticks[-1] >= 4360
+
+
+def test_figure_pool_reuses_figures_across_threads():
+    """
+    Test that pooled figures are shared by concurrent renders
+    and never exceed the pool size once returned.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from base_components.matplotlib_viz import FigurePool, figure2fasthtml
+
+    pool = FigurePool(size=2)
+
+    def render(value):
+        with pool.axes() as (fig, ax):
+            ax.clear()
+            ax.barh([''], [value])
+            return figure2fasthtml(fig)
+
+    with ThreadPoolExecutor(4) as executor:
+        images = list(executor.map(render, [0.1, 0.2, 0.3, 0.4] * 3))
+
+    assert all(img.attrs['src'].startswith('data:image/png') for img in images)
+    assert len(pool._idle) <= 2
+
+
+def test_numpy_scorer_matches_sklearn(tmp_path):
+    """
+    Test that the exported scorer reproduces the
+    sklearn model's probabilities and predictions.
+    """
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from utils import export_model, LogisticScorer
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.integers(0, 1000, (200, 2)),
+                     columns=['positive_events', 'negative_events'])
+    y = (X.positive_events > X.negative_events).astype(int)
+    model = LogisticRegression(penalty=None, max_iter=1000).fit(X, y)
+
+    path = tmp_path / 'model.json'
+    export_model(model, X, path)
+    scorer = LogisticScorer.load(path)
+
+    # Column order comes from the exported feature names
+    shuffled = X[['negative_events', 'positive_events']]
+    np.testing.assert_allclose(
+        scorer.predict_proba(shuffled), model.predict_proba(X), atol=1e-9)
+    assert (scorer.predict(X) == model.predict(X)).all()
+
+
+def test_refresh_risk_scores_tolerates_read_only_databases(monkeypatch, caplog):
+    """
+    Test that startup scoring logs a database it cannot
+    write to instead of stopping the app from starting.
+    """
+    import sqlite3
+    from employee_events import risk_scores
+    from utils import refresh_risk_scores
+
+    def refresh(*args, **kwargs):
+        raise sqlite3.OperationalError("attempt to write a readonly database")
+
+    monkeypatch.setattr(risk_scores, 'refresh', refresh)
+    assert refresh_risk_scores() is False
+    assert 'readonly' in caplog.text
+
+
+def test_dashboard_import_defers_heavy_dependencies():
+    """
+    Test that importing the report app loads neither
+    pandas, matplotlib nor sklearn.
+    """
+    import subprocess
+
+    code = (
+        "import sys, dashboard; "
+        "loaded = {'pandas', 'matplotlib', 'sklearn'} & set(sys.modules); "
+        "assert not loaded, loaded"
+    )
+    subprocess.run([sys.executable, '-c', code],
+                   cwd=project_root / 'report', check=True)
+
+
+def test_combined_component_renders_children_concurrently():
+    """
+    Test that concurrent children keep their declared order
+    and a failing or slow child does not break the page.
+    """
+    import threading
+    import time
+    from fasthtml.components import Div, P, to_xml
+    from combined_components import CombinedComponent
+
+    release = threading.Event()
+
+    class Slow:
+        def __call__(self, userid, model):
+            release.wait(5)
+            return P(f"slow {userid}")
+
+    class Broken:
+        def __call__(self, userid, model):
+            raise RuntimeError("no data")
+
+    class Fast:
+        def __call__(self, userid, model):
+            return P(f"fast {userid}")
+
+    class Page(CombinedComponent):
+        concurrent = True
+        child_timeout = 0.5
+        outer_div_type = Div(cls='grid')
+        children = [Fast(), Slow(), Broken(), Fast()]
+
+    page = Page()
+    started = time.monotonic()
+    html = to_xml(page(1, FakeModel()))
+    release.set()
+
+    assert time.monotonic() - started < 2
+    assert html.index('fast 1') < html.index('Slow is unavailable')
+    assert html.index('Slow is unavailable') < html.index('Broken is unavailable')
+    assert html.count('fast 1') == 2
+
+    # The shared template is never filled in
+    assert Page.outer_div_type.children == ()
+    assert to_xml(page(2, FakeModel())).count('<p>') == 3
+
+
+def test_combined_component_times_out_each_child(caplog):
+    """
+    Test that every child, the first one included, is
+    timed out on its own deadline, and that timeouts are
+    logged without a traceback.
+    """
+    import threading
+    import time
+    from fasthtml.components import Div, P, to_xml
+    from combined_components import CombinedComponent
+
+    release = threading.Event()
+
+    class Slow:
+        def __call__(self, userid, model):
+            release.wait(5)
+            return P("slow")
+
+    class Steady:
+        def __call__(self, userid, model):
+            time.sleep(0.3)
+            return P("steady")
+
+    class Page(CombinedComponent):
+        concurrent = True
+        child_timeout = 0.5
+        outer_div_type = Div(cls='grid')
+        children = [Slow(), Steady()]
+
+    started = time.monotonic()
+    try:
+        html = to_xml(Page()(1, FakeModel()))
+    finally:
+        release.set()
+
+    assert time.monotonic() - started < 2
+    assert 'Slow is unavailable' in html and 'steady' in html
+    errors = [record for record in caplog.records if record.levelname == 'ERROR']
+    assert len(errors) == 1 and not errors[0].exc_info
+
+
+def test_combined_component_acall_matches_call():
+    """
+    Test that awaiting a combined component renders the
+    same markup as calling it, and isolates failing children.
+    """
+    import asyncio
+    from fasthtml.components import Div, P, to_xml
+    from base_components import BaseComponent
+    from combined_components import CombinedComponent, FormGroup
+
+    class Name(BaseComponent):
+        def build_component(self, entity_id, model):
+            return P(f"{model.name} {entity_id}")
+
+    class Broken(BaseComponent):
+        def build_component(self, entity_id, model):
+            raise RuntimeError("no data")
+
+    class Form(FormGroup):
+        children = [Name()]
+
+    class Page(CombinedComponent):
+        outer_div_type = Div(cls='grid')
+        children = [Name(), Form(), P("static")]
+
+    model = FakeModel()
+    page = Page()
+    assert to_xml(asyncio.run(page.acall(4, model))) == to_xml(page(4, model))
+
+    Page.children = [Name(), Broken()]
+    html = to_xml(asyncio.run(page.acall(4, model)))
+    assert 'employee 4' in html and 'Broken is unavailable' in html
+
+
+def test_paged_data_table_links_the_next_page():
+    """
+    Test that a paged table renders one page of rows
+    and a button that requests the rows after it.
+    """
+    import pandas as pd
+    from fasthtml.components import to_xml
+    from base_components import DataTable
+
+    frame = pd.DataFrame({'note_date': ['2024-01-0%d' % day for day in range(1, 6)],
+                          'note': list('abcde')})
+
+    class Notes(DataTable):
+        page_size = 2
+        load_more_url = '/notes'
+
+        def page_data(self, entity_id, model, after):
+            start = int(after[0]) if after else 0
+            page = frame.iloc[start:start + self.page_size]
+            stop = start + self.page_size
+            return page, ((str(stop),) if stop < len(frame) else None)
+
+    table = to_xml(Notes()(1, FakeModel()))
+    assert table.count('<td>') == 4
+    assert 'hx-get="/notes/employee/1?after=2"' in table
+
+    last = to_xml(Notes().page(1, FakeModel(), ['4']))
+    assert last.count('<td>') == 2 and 'Load more' not in last
+
+
+def test_combined_component_streams_children_in_order():
+    """
+    Test that streaming yields the outer tags and each child
+    separately, and the joined chunks match the awaited render.
+    """
+    import asyncio
+    from fasthtml.components import Div, P, to_xml
+    from base_components import BaseComponent
+    from combined_components import CombinedComponent, FormGroup
+
+    class Slow(BaseComponent):
+        def build_component(self, entity_id, model):
+            import time
+            time.sleep(0.2)
+            return P("slow")
+
+    class Fast(BaseComponent):
+        def build_component(self, entity_id, model):
+            return P("fast")
+
+    class Form(FormGroup):
+        id = "filters"
+        children = [Fast()]
+
+    class Page(CombinedComponent):
+        outer_div_type = Div(cls='container')
+        children = [Fast(), Form(), Slow()]
+
+    async def collect():
+        return [chunk async for chunk in Page().astream(1, FakeModel())]
+
+    chunks = asyncio.run(collect())
+    assert chunks[0] == '<div class="container">'
+    assert 'slow' in chunks[3] and '<button>Submit</button>' in chunks[2]
+    assert chunks[-1].strip() == '</div>'
+
+    expected = to_xml(asyncio.run(Page().acall(1, FakeModel())))
+    assert ''.join(''.join(chunks).split()) == ''.join(expected.split())
+
+
+def test_streamed_page_shell_matches_fasthtml():
+    """
+    Test that the markup streamed around a page is the
+    one FastHTML wraps around a route's response, with
+    the app's headers, footers, attributes and title.
+    """
+    from fasthtml.core import FastHTML
+    from fasthtml.components import Div, Script, Style, Title, to_xml
+    from starlette.testclient import TestClient
+    import dashboard
+
+    app = FastHTML(hdrs=[Style('p {}')], ftrs=[Script('done()')],
+                   htmlkw={'lang': 'en'}, cls='page')
+
+    @app.get('/')
+    def page():
+        return Title('Report'), Div('body')
+
+    expected = TestClient(app).get('/').text
+    head, tail = dashboard.page_shell(app, 'Report')
+    streamed = head + to_xml(Div('body')) + tail
+    assert ''.join(streamed.split()) == ''.join(expected.split())
+
+
+def test_deferred_children_render_placeholders():
+    """
+    Test that deferred children are replaced by an HTMX
+    placeholder pointing at their fragment route.
+    """
+    import asyncio
+    from fasthtml.components import Div, P, to_xml
+    from base_components import BaseComponent
+    from combined_components import CombinedComponent
+
+    class Chart(BaseComponent):
+        deferred = True
+        fragment_name = 'chart'
+
+        def build_component(self, entity_id, model):
+            raise AssertionError("deferred components are not rendered")
+
+    class Page(CombinedComponent):
+        outer_div_type = Div(cls='grid')
+        children = [Chart()]
+
+    for html in (to_xml(Page()(7, FakeModel())),
+                 to_xml(asyncio.run(Page().acall(7, FakeModel())))):
+        assert 'hx-get="/fragment/chart/employee/7"' in html
+        assert 'hx-trigger="load"' in html
+
+    # The fragment route renders the component itself
+    Chart.build_component = lambda self, entity_id, model: P(entity_id)
+    assert to_xml(Chart()(7, FakeModel())) == to_xml(P(7))
+
+
+def test_chart_images_are_content_addressed(tmp_path):
+    """
+    Test that chart URLs change with the data version and
+    that each image is rendered once into the disk cache.
+    """
+    from fasthtml.components import to_xml
+    from base_components import MatplotlibViz
+    from base_components.image_cache import ImageCache
+
+    renders = []
+
+    class Chart(MatplotlibViz):
+        backend = 'svg'
+        fragment_name = 'chart'
+        image_url = '/chart'
+        image_cache = ImageCache(tmp_path, max_files=8)
+
+        def chart_data(self, entity_id, model):
+            renders.append(entity_id)
+            return entity_id
+
+        def svg(self, data):
+            return f'<svg>{data}</svg>'
+
+    chart, model = Chart(), FakeModel()
+    html = to_xml(chart(3, model))
+    key = chart.image_key(3, model)
+    assert f'src="/chart/chart/employee/3/{key}"' in html
+    assert key.endswith('.svg')
+
+    assert chart.image(3, model, key) == b'<svg>3</svg>'
+    assert chart.image(3, model, key) == b'<svg>3</svg>'
+    assert renders == [3]
+    assert (tmp_path / key).exists()
+
+    model.version = "v2"
+    assert chart.image_key(3, model) != key
+
+    # A change to the rendering code changes every key
+    from base_components import matplotlib_viz
+    original = matplotlib_viz.renderer_version
+    matplotlib_viz.renderer_version = lambda component_type: 'next-deploy'
+    try:
+        changed = chart.image_key(3, model)
+    finally:
+        matplotlib_viz.renderer_version = original
+    assert changed != chart.image_key(3, model)
+
+
+def test_conditional_get_skips_unchanged_pages():
+    """
+    Test that a page whose data version has not changed is
+    answered with a 304 without running the route, and
+    that larger pages are compressed.
+    """
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.responses import HTMLResponse
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+    from http_caching import ConditionalGetMiddleware, CompressionMiddleware
+
+    calls = []
+    state = {'version': 'v1'}
+
+    def page(request):
+        calls.append(request.url.path)
+        return HTMLResponse('<p>report</p>' * 100)
+
+    app = Starlette(routes=[Route('/team/1', page)], middleware=[
+        Middleware(CompressionMiddleware),
+        Middleware(ConditionalGetMiddleware,
+                   version=lambda: state['version'],
+                   deploy='build-1',
+                   prefixes=('/team/',)),
+    ])
+    client = TestClient(app)
+
+    first = client.get('/team/1', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['content-encoding'] == 'gzip'
+    assert first.text == '<p>report</p>' * 100
+
+    etag = first.headers['etag']
+    assert client.get('/team/1', headers={'If-None-Match': etag}).status_code == 304
+    # Only the ETag validates a page
+    assert 'last-modified' not in first.headers
+    since = 'Wed, 01 Jan 2098 00:00:00 GMT'
+    assert client.get('/team/1', headers={'If-Modified-Since': since}).status_code == 200
+    assert len(calls) == 2
+
+    # Another worker of the same deploy agrees on the ETag
+    other = ConditionalGetMiddleware(None, version=lambda: state['version'],
+                                     deploy='build-1')
+    assert other.etag({}) == etag
+
+    state['version'] = 'v2'
+    assert client.get('/team/1', headers={'If-None-Match': etag}).status_code == 200
+    assert len(calls) == 3
+
+
+@pytest.fixture
+def dashboard_client():
+    """
+    Test client for the report app, without the startup
+    hooks. Restores the event store the app installs.
+    """
+    from employee_events import QueryBase
+    from starlette.testclient import TestClient
+
+    event_store = QueryBase.event_store
+    import dashboard
+    yield TestClient(dashboard.app)
+    QueryBase.event_store = event_store
+
+
+def test_notes_route_rejects_malformed_cursors(dashboard_client):
+    """
+    Test that the notes route answers a malformed
+    cursor with a 400 instead of an error.
+    """
+    for query in ('after=x', 'after=2024-01-01&after=x', 'after=a&after=1&after=2'):
+        response = dashboard_client.get(f'/notes/team/1?{query}')
+        assert response.status_code == 400, query
+
+    assert dashboard_client.get('/notes/team/1?after=2000-01-01&after=0').status_code == 200
+
+
+def test_image_cache_refuses_shared_directories(tmp_path):
+    """
+    Test that the chart cache is created private and
+    refuses a directory other users could have written to.
+    """
+    import os
+    from base_components.image_cache import ImageCache
+
+    cache = ImageCache(tmp_path / 'charts')
+    cache.put('a.svg', b'<svg/>')
+    assert (tmp_path / 'charts').stat().st_mode & 0o777 == 0o700
+
+    # An image planted in a shared directory is never served
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    (shared / 'a.svg').write_bytes(b'<svg onload="planted"/>')
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        ImageCache(shared).get('a.svg')
+    with pytest.raises(PermissionError):
+        ImageCache(shared).put('b.svg', b'<svg/>')
+    assert shared.stat().st_mode & 0o777 == 0o777
+
+
+def test_routes_reject_non_numeric_ids(dashboard_client):
+    """
+    Test that chart and fragment routes answer a
+    non-numeric entity id with a 404.
+    """
+    assert dashboard_client.get('/chart/line_chart/employee/abc/x.svg').status_code == 404
+    assert dashboard_client.get('/fragment/line_chart/employee/abc').status_code == 404
+
+
+def test_risk_chart_follows_ingested_events(tmp_path, monkeypatch):
+    """
+    Test that the risk chart stops using a stored score
+    once events are ingested, and uses the recomputed one
+    after an ingestion with a rescoring hook.
+    """
+    import shutil
+    from employee_events import Employee, QueryBase, pool, risk_scores
+    from employee_events.ingestion import ingest
+    from employee_events.sql_execution import db_path
+    import dashboard
+    import utils
+
+    copy = tmp_path / 'employee_events.db'
+    shutil.copy(db_path, copy)
+    monkeypatch.setattr(QueryBase, 'event_store', None)
+    pool.retarget(f"{copy.as_uri()}?mode=ro")
+    try:
+        chart = dashboard.BarChart()
+        model = Employee()
+        assert model.risk_score(1) is not None
+        before = chart.chart_data(1, model)
+
+        ingest([('2099-01-01', 1, 1, 0, 40)], database=copy)
+        assert model.risk_score(1) is None
+        after = chart.chart_data(1, model)
+        assert after != before
+
+        # Rescoring stores the score the chart computes inline
+        def rescore(database):
+            risk_scores.refresh(utils.scorer_path, database, loader=utils.load_model)
+
+        ingest([('2099-01-02', 1, 1, 0, 40)], database=copy, rescore=rescore)
+        assert model.risk_score(1) is not None
+        assert model.risk_score(1) != after
+        assert model.risk_score(1) == pytest.approx(chart.predictor.predict_proba(
+            model.model_data(1))[:, 1][0])
+    finally:
+        pool.retarget(None)